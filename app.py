@@ -1,39 +1,48 @@
 from flask import Flask, send_file
 from src.visualization.map_renderer import MapRenderer
 from src.api.unms_client import UNMSClient
-from pathlib import Path
+from src.config import get_config
 import asyncio
-import yaml
+import io
 import sys
 import traceback
 import signal
+import threading
 
 app = Flask(__name__)
 
-config = None
+# UNMS client shared across requests so its connection pool and response cache stay warm
+unms = None
 
-def load_config(config_path: Path) -> dict:
-    with open(config_path) as f:
-        return yaml.safe_load(f)
+# Persistent event loop shared by every request, driven by a background thread
+loop = asyncio.new_event_loop()
+loop_thread = threading.Thread(target=loop.run_forever, daemon=True)
+loop_thread.start()
 
 def handle_shutdown_signal(signal, frame):
     """
     Handle termination signals to ensure proper cleanup.
     """
-    loop = asyncio.get_event_loop()
-    asyncio.run(shutdown(loop))
+    asyncio.run_coroutine_threadsafe(shutdown(loop), loop).result()
+
+    # Close the loop once it has stopped so its selector and file descriptors are released
+    loop_thread.join()
+    loop.close()
     sys.exit(0)
 
 # Define the shutdown function
 async def shutdown(loop):
     """
-    Cancel all running tasks and stop the event loop.
+    Close the UNMS client, cancel all running tasks and stop the event loop.
     """
+    if unms is not None:
+        await unms.aclose()
     tasks = [t for t in asyncio.all_tasks(loop) if t is not asyncio.current_task(loop)]
     for task in tasks:
         task.cancel()
     await asyncio.gather(*tasks, return_exceptions=True)
-    loop.stop()
+    # Stop on the next iteration so callers waiting on this coroutine still get its result
+    loop.call_soon(loop.stop)
 
 @app.route("/")
 def main():
@@ -41,40 +50,12 @@ def main():
     Generate the map and serve it as an HTML file.
     """
     try:
-        # Create a new event loop for the current thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop.run_until_complete(generate_map())
-    except Exception as e:
-        return f"An error occurred: {e}", 500
-    
-async def generate_map():
-    """
-        Asynchronous logic to generate the map.
-    """
-    try:
-        # Initialize UNMS client
-        unms = UNMSClient(base_url=config['unms']['url'], api_key=config['unms']['api_key'])
-
-        # Fetch antennas
-        antennas = unms.get_aps()
-
-        # Initialize MapRenderer and center map on locality
-        renderer = MapRenderer(config['map']['center_lat'], config['map']['center_lon'])
-
-        # Add antenna coverage to the map
-        #for antenna in antennas:
-        #    renderer.add_antenna_directional_cone(antenna)
-        tasks = [renderer.add_antenna_directional_cone(antenna) for antenna in antennas]
-        await asyncio.gather(*tasks)
+        # Hand the work to the persistent event loop and wait for the result
+        future = asyncio.run_coroutine_threadsafe(generate_map(), loop)
+        html_bytes = future.result()
 
-        # Finalize and save the map
-        renderer.finalize_map()
-        output_file = "output_map.html"
-        renderer.save_map(output_file)
-
-        # Serve the generated map
-        return send_file(output_file)
+        # Serve the generated map straight from memory
+        return send_file(io.BytesIO(html_bytes), mimetype='text/html', download_name='map.html')
 
     except Exception as e:
         # Get the exception information
@@ -87,12 +68,39 @@ async def generate_map():
         formatted_traceback = traceback.format_exc()
 
         return f"<h4>An error occurred: {e}</h4><pre>{formatted_traceback}</pre>", 500
+    
+async def generate_map() -> bytes:
+    """
+        Asynchronous logic to generate the map. Returns the rendered map HTML.
+    """
+    global unms
+    config = get_config()
+
+    # Initialize UNMS client once, on the persistent event loop
+    if unms is None:
+        unms = UNMSClient(
+            base_url=config['unms']['url'],
+            api_key=config['unms']['api_key'],
+            debug=app.debug,
+            cache_ttl=config['unms'].get('cache_ttl', 300)
+        )
+
+    # Fetch antennas
+    antennas = await unms.get_aps()
+
+    # Initialize MapRenderer and center map on locality
+    renderer = MapRenderer(config['map']['center_lat'], config['map']['center_lon'])
+
+    # Add antenna coverage to the map
+    await renderer.render_all(antennas)
+
+    # Finalize and render the map
+    renderer.finalize_map()
+    return renderer.render_html_bytes()
 
 if __name__ == "__main__":
-    # Load configuration
     try:
-        config_path = Path("config/config.yaml")
-        config = load_config(config_path)
+        config = get_config()
     except Exception as e:
         print(f"Failed to load config: {e}")
         sys.exit(1)
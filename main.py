@@ -1,35 +1,39 @@
 # main.py
 import argparse
+import asyncio
 from pathlib import Path
 from src.api.unms_client import UNMSClient
 from src.visualization.map_renderer import MapRenderer
-import yaml
+from src.config import load_config
 
-def load_config(config_path: Path) -> dict:
-    with open(config_path) as f:
-        return yaml.safe_load(f)
-
-def main():
-    parser = argparse.ArgumentParser(description="Ubiquiti Antenna Spectrum Mapper")
-    parser.add_argument('--config', default='config/config.yaml', help='Path to config file')
-    parser.add_argument('--output', default='output_map.html', help='Output map filename')
-    args = parser.parse_args()
-    
-    config = load_config(Path(args.config))
-    
+async def render_map(config: dict, output: str):
+    """Fetch antennas and render their coverage through the same async path as the web app"""
     # Initialize clients and renderer
     unms = UNMSClient(config['unms']['url'], config['unms']['api_key'])
     renderer = MapRenderer(config['map']['center_lat'], config['map']['center_lon'])
     
     # Get antennas and render coverage
-    antennas = unms.get_aps()
+    try:
+        antennas = await unms.get_aps()
+    finally:
+        await unms.aclose()
     for antenna in antennas:
         print(f"{antenna.name}")
-        renderer.add_antenna_coverage(antenna)
+    await renderer.render_all(antennas)
     
     # Save the map
     renderer.finalize_map()
-    renderer.save_map(args.output)
+    renderer.save_map(output)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ubiquiti Antenna Spectrum Mapper")
+    parser.add_argument('--config', default='config/config.yaml', help='Path to config file')
+    parser.add_argument('--output', default='output_map.html', help='Output map filename')
+    args = parser.parse_args()
+    
+    config = load_config(Path(args.config))
+    
+    asyncio.run(render_map(config, args.output))
     print(f"Map saved to {args.output}")
 
 if __name__ == "__main__":
@@ -1,18 +1,20 @@
 from flask import Flask, request, jsonify
 from pathlib import Path
+from typing import Optional
 import argparse
+import os
 import sys
+
+# GDAL block cache size (MB) and lazy strile loading must be set before the first rasterio.open
+os.environ.setdefault("GDAL_CACHEMAX", "512")
+os.environ.setdefault("GTIFF_USE_DEFER_STRILE_LOADING", "YES")
+
+import numpy as np
 import rasterio
-import yaml
 from rasterio.transform import from_origin
 from rasterio.merge import merge
 from rasterio.plot import show
-
-def load_config(config_path: Path) -> dict:
-    with open(config_path) as f:
-        return yaml.safe_load(f)
-    
-config = load_config(Path("config/config.yaml"))
+from src.config import get_config
 
 app = Flask(__name__)
 
@@ -39,8 +41,6 @@ def get_elevation(lat: float, lon: float):
     """
     Get elevation data for a given latitude and longitude.
     """
-    global dataset
-
     if lat is None or lon is None:
         print("Missing latitude or longitude parameters")
         return jsonify({"error": "Please provide 'lat' and 'lon' parameters"}), 400
@@ -48,40 +48,113 @@ def get_elevation(lat: float, lon: float):
     try:
         # Use the preloaded dataset
         elevation = get_elevation_from_dataset(dataset, float(lat), float(lon))
+        if elevation is None:
+            return jsonify({"error": "No elevation data at the given point"}), 404
         return jsonify({"latitude": lat, "longitude": lon, "elevation": elevation})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def get_elevation_from_dataset(dataset, lat: float, lon: float) -> float:
+@app.route("/elevations", methods=["POST"])
+def get_elevations():
+    """
+    Get elevation data for a batch of points in a single request.
+
+    Expects a JSON body of the form {"points": [[lat, lon], ...]}.
+    """
+    payload = request.get_json(silent=True)
+    points = payload.get("points") if isinstance(payload, dict) else None
+    if not points:
+        print("Missing points parameter")
+        return jsonify({"error": "Please provide a 'points' list of [lat, lon] pairs"}), 400
+
+    # Reject anything but a list of [lat, lon] pairs of finite JSON numbers; bools and numeric
+    # strings would otherwise pass through NumPy's float conversion as coordinates
+    if not isinstance(points, list) or not all(
+            isinstance(point, list) and len(point) == 2 and all(
+                isinstance(value, (int, float)) and not isinstance(value, bool) and np.isfinite(value)
+                for value in point)
+            for point in points):
+        print("Malformed points parameter")
+        return jsonify({"error": "Please provide a 'points' list of [lat, lon] pairs"}), 400
+    coords = np.asarray(points, dtype=float)
+
+    try:
+        # Use the preloaded dataset
+        elevations = get_elevations_from_dataset(dataset, coords)
+        return jsonify({"points": points, "elevations": elevations})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def has_elevation_data(dataset, rows, cols, values) -> np.ndarray:
+    """
+    Check samples against the raster extent and its nodata value.
+
+    :param dataset: Preloaded rasterio dataset.
+    :param rows: Fractional raster rows of the samples.
+    :param cols: Fractional raster columns of the samples.
+    :param values: Sampled values.
+    :return: True where a sample lies inside the raster and is not nodata.
+    """
+    rows, cols, values = np.asarray(rows), np.asarray(cols), np.asarray(values, dtype=float)
+    valid = (rows >= 0) & (rows < dataset.height) & (cols >= 0) & (cols < dataset.width)
+    if dataset.nodata is not None:
+        valid &= ~np.isnan(values) if np.isnan(dataset.nodata) else values != dataset.nodata
+    return valid
+
+def get_elevation_from_dataset(dataset, lat: float, lon: float) -> Optional[float]:
     """
     Get elevation data from a preloaded GeoTIFF dataset for a given latitude and longitude.
 
     :param dataset: Preloaded rasterio dataset.
     :param lat: Latitude of the point.
     :param lon: Longitude of the point.
-    :return: Elevation value at the given point.
+    :return: Elevation value at the given point, None outside the raster or on nodata.
     """
-    # Convert lat/lon to row/col in the raster
-    row, col = dataset.index(lon, lat)
-    # Get the elevation value
-    elevation = dataset.read(1)[row, col]
+    # Sample only the block containing the point instead of reading the whole band
+    col, row = ~dataset.transform * (lon, lat)
+    elevation = next(dataset.sample([(lon, lat)]))[0]
+    if not has_elevation_data(dataset, row, col, elevation):
+        return None
     return float(elevation)
 
-def get_elevation_from_tif(tif_file: str, lat: float, lon: float) -> float:
+def get_elevations_from_dataset(dataset, points: list) -> list:
+    """
+    Get elevation data from a preloaded GeoTIFF dataset for a batch of points.
+
+    Points are sampled in raster (row, col) order so neighbouring lookups hit the
+    same blocks in GDAL's cache, then returned in the order they were given.
+
+    :param dataset: Preloaded rasterio dataset.
+    :param points: (latitude, longitude) pairs, as a list or an (N, 2) array.
+    :return: Elevation values in the same order as the input points, None outside the raster or on nodata.
+    """
+    coords = np.asarray(points, dtype=float)
+    lats, lons = coords[:, 0], coords[:, 1]
+
+    # Sort the points by raster row, then column, using the inverse affine on the whole array
+    cols, rows = ~dataset.transform * (lons, lats)
+    order = np.lexsort((np.floor(cols), np.floor(rows)))
+
+    samples = dataset.sample(zip(lons[order], lats[order]))
+    sorted_elevations = np.fromiter((sample[0] for sample in samples), dtype=float, count=len(order))
+
+    # Undo the sort so results line up with the request
+    elevations = np.empty_like(sorted_elevations)
+    elevations[order] = sorted_elevations
+    valid = has_elevation_data(dataset, rows, cols, elevations)
+    return [elevation if ok else None for elevation, ok in zip(elevations.tolist(), valid.tolist())]
+
+def get_elevation_from_tif(tif_file: str, lat: float, lon: float) -> Optional[float]:
     """
     Get elevation data from a GeoTIFF file for a given latitude and longitude.
 
     :param tif_file: Path to the GeoTIFF file.
     :param lat: Latitude of the point.
     :param lon: Longitude of the point.
-    :return: Elevation value at the given point.
+    :return: Elevation value at the given point, None outside the raster or on nodata.
     """
     with rasterio.open(tif_file) as dataset:
-        # Convert lat/lon to row/col in the raster
-        row, col = dataset.index(lon, lat)
-        # Get the elevation value
-        elevation = dataset.read(1)[row, col]
-        return float(elevation)
+        return get_elevation_from_dataset(dataset, lat, lon)
 
 def merge_tif_files(tif_files: list, output_path: str):
     """
@@ -90,6 +163,10 @@ def merge_tif_files(tif_files: list, output_path: str):
     :param tif_files: List of paths to the GeoTIFF files.
     :param output_path: Path to save the merged GeoTIFF file.
     """
+    # Optional dependency, only merging needs it so the elevation server starts without it
+    from rio_cogeo.cogeo import cog_translate
+    from rio_cogeo.profiles import cog_profiles
+
     src_files_to_mosaic = []
 
     # Open each GeoTIFF file
@@ -100,19 +177,35 @@ def merge_tif_files(tif_files: list, output_path: str):
     # Merge the files
     mosaic, out_transform = merge(src_files_to_mosaic)
 
-    # Save the merged file
+    # Save the merged file as internally tiled, compressed blocks
     out_meta = src_files_to_mosaic[0].meta.copy()
     out_meta.update({
         "driver": "GTiff",
         "height": mosaic.shape[1],
         "width": mosaic.shape[2],
-        "transform": out_transform
+        "transform": out_transform,
+        "tiled": True,
+        "blockxsize": 256,
+        "blockysize": 256,
+        "compress": "DEFLATE",
+        # Floating point predictor for elevation floats, horizontal differencing for integers
+        "predictor": 3 if np.issubdtype(mosaic.dtype, np.floating) else 2
     })
 
-    with rasterio.open(output_path, "w", **out_meta) as dest:
+    for src in src_files_to_mosaic:
+        src.close()
+
+    tmp_path = Path(output_path).with_suffix(".tmp.tif")
+    with rasterio.open(tmp_path, "w", **out_meta) as dest:
         dest.write(mosaic)
 
-    print(f"Merged GeoTIFF saved to {output_path}")
+    # Rewrite as a Cloud-Optimized GeoTIFF so overviews and the tile index come first
+    cog_profile = cog_profiles.get("deflate")
+    cog_profile.update(blockxsize=256, blockysize=256, predictor=out_meta["predictor"])
+    cog_translate(str(tmp_path), output_path, cog_profile, quiet=True)
+    tmp_path.unlink()
+
+    print(f"Merged Cloud-Optimized GeoTIFF saved to {output_path}")
 
 def main():
     parser = argparse.ArgumentParser(description="Rasterizer utility for elevation data.")
@@ -123,6 +216,7 @@ def main():
         help="Merge all TIFF files located within the provided directory."
     )
     args = parser.parse_args()
+    config = get_config()
 
     if args.merge:
         # Merge all TIFF files in the specified directory
@@ -145,9 +239,11 @@ def main():
         output_path = tiff_directory / "merged/merged.tif"
         merge_tif_files(tiff_files, str(output_path))
     else:
+        # Preload the dataset once so every request shares the same open handle
+        preload_tiff()
+
         # Start the Flask server
         app.run(host="0.0.0.0", port=config['map']['elevation_server_port'])
 
 if __name__ == "__main__":
-    #preload_tiff()
     main()
\ No newline at end of file
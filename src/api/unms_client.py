@@ -1,157 +1,179 @@
 # unms_client.py
-import requests
+import httpx
+import asyncio
 import math
-import json
+import numpy as np
+import orjson
+from collections import defaultdict
 from pathlib import Path
 from typing import List, Dict, Tuple
 from dataclasses import dataclass
-from cachetools import cached, TTLCache
+from cachetools import TTLCache
 from src.visualization.models.antenna import Antenna
     
 class UNMSClient:
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, debug: bool = False, cache_ttl: int = 300):
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-        self.session = requests.Session()
-        self.session.headers.update({'x-auth-token': api_key})
+        self.debug = debug
+        # Pooled keep-alive connections; HTTP/2 lets devices and sites share one TCP connection
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'x-auth-token': api_key},
+            http2=True,
+            timeout=30
+        )
+        # Responses are cached per client instance, keep the client alive to reuse them
+        self._cache = TTLCache(maxsize=100, ttl=cache_ttl)
+
+    async def aclose(self):
+        """Close the pooled HTTP connections"""
+        await self.client.aclose()
     
-    @cached(cache=TTLCache(maxsize=100, ttl=300))
-    def get_devices(self) -> List[Dict]:
-        response = self.session.get(f"{self.base_url}/v2.1/devices")
-        response.raise_for_status()
-        return response.json()
+    async def get_devices(self) -> List[Dict]:
+        if 'devices' not in self._cache:
+            response = await self.client.get("/v2.1/devices")
+            response.raise_for_status()
+            self._cache['devices'] = orjson.loads(response.content)
+        return self._cache['devices']
     
-    @cached(cache=TTLCache(maxsize=100, ttl=300))
-    def get_sites(self) -> List[Dict]:
-        response = self.session.get(f"{self.base_url}/v2.1/sites")
-        response.raise_for_status()
-        return response.json()
-
-    def get_aps(self) -> List[Antenna]:
-        devices = self.get_devices()
+    async def get_sites(self) -> List[Dict]:
+        if 'sites' not in self._cache:
+            response = await self.client.get("/v2.1/sites")
+            response.raise_for_status()
+            self._cache['sites'] = orjson.loads(response.content)
+        return self._cache['sites']
+
+    async def get_aps(self) -> List[Antenna]:
+        # Fetch devices and sites concurrently
+        devices, sites = await asyncio.gather(self.get_devices(), self.get_sites())
         antennas = []
         
         # Dump the raw JSON response to a file for debugging
-        with open('devices.json', 'w') as f:
-            json.dump(devices, f, indent=4)
+        if self.debug:
+            Path('devices.json').write_bytes(orjson.dumps(devices, option=orjson.OPT_INDENT_2))
+
+        # Collect infrastructure site ids once so each device check is a set lookup
+        site_ids = {site['identification']['id'] for site in sites
+                    if site['identification']['type'] == 'site'}
+
+        # Index child station coordinates by SSID once instead of rescanning devices per AP
+        child_index = self.build_child_station_index(devices)
 
         for device in devices:
-            if self._is_ap(device) and self._is_infrastructure(device):
-                if self._is_wave(device) or self._is_airfiber_60(device):
-                    antennas.append(Antenna(
-                        id=device['identification']['id'],
-                        name=device['identification']['name'],
-                        latitude=device['location']['latitude'],
-                        longitude=device['location']['longitude'],
-                        azimuth=self.get_azimuth(device),
-                        downtilt=device['location']['tilt'] if device['location'].get('tilt') else 0,
-                        frequency=device['overview']['frequency'],
-                        channel_width=device['overview']['channelWidth'],
-                        height=device['location']['altitude'], # MSL, may need converting to AGL
-                        model=device['identification']['model'], 
-                        antenna=device['overview']['antenna']['name'] 
-                    ))
-                elif self._is_airmax(device):
-                    antennas.append(Antenna(
-                        id=device['identification']['id'],
-                        name=device['identification']['name'],
-                        latitude=device['location']['latitude'],
-                        longitude=device['location']['longitude'],
-                        azimuth=self.get_azimuth(device),
-                        downtilt=device['location']['tilt'] if device['location'].get('tilt') else 0,
-                        frequency=device['overview']['frequency'],
-                        channel_width=device['overview']['channelWidth'],
-                        height=device['location']['altitude'], # MSL, may need converting to AGL
-                        model=device['identification']['model'],
-                        antenna=device['overview']['antenna']['name'] 
-                    ))
+            # Bind the nested sections once; every predicate below works on these locals
+            ident = device.get('identification') or {}
+            overview = device.get('overview') or {}
+            wireless_mode = (overview.get('wirelessMode') or '').lower()
+            site_id = (ident.get('site') or {}).get('id')
+
+            if not (self._is_ap(wireless_mode) and self._is_infrastructure(site_id, site_ids)):
+                continue
+
+            device_type = (ident.get('type') or '').lower()
+            model = (ident.get('model') or '').lower()
+            if self._is_wave(device_type) or self._is_airfiber_60(device_type, model) or self._is_airmax(device_type):
+                location = device['location']
+                antennas.append(Antenna(
+                    id=ident['id'],
+                    name=ident['name'],
+                    latitude=location['latitude'],
+                    longitude=location['longitude'],
+                    azimuth=self.get_azimuth(device, child_index),
+                    downtilt=location.get('tilt') or 0,
+                    frequency=overview['frequency'],
+                    channel_width=overview['channelWidth'],
+                    height=location['altitude'], # MSL, may need converting to AGL
+                    model=ident['model'],
+                    antenna=overview['antenna']['name']
+                ))
         return antennas
 
-    def get_azimuth(self, device: Dict) -> int:
+    def get_azimuth(self, device: Dict, child_index: Dict[str, List[Tuple[float, float]]]) -> int:
         # Implement logic to extract azimuth from device data
-        if device.get('location') and device['location'].get('heading'):
-            print(f"{device['identification']['name']} - has compass sensor data.")
-            return int(device['location']['heading'])
+        name = device['identification']['name']
+        location = device.get('location') or {}
+        if location.get('heading'):
+            print(f"{name} - has compass sensor data.")
+            return int(location['heading'])
         
         # If azimuth note exists in UNMS for this device, override compass sensor data
         # Note: This assumes the note is a JSON string with an "azimuth" key
         # UNMS device note example: {"azimuth": 45}
-        if device.get('meta').get('note'):
-            note_json = json.loads(device['meta']['note'])
-            print(f"{device['identification']['name']} - has a note with override, azimuth: {int(note_json['azimuth'])}")
+        note = (device.get('meta') or {}).get('note')
+        if note:
+            note_json = orjson.loads(note)
             if 'azimuth' in note_json:
+                print(f"{name} - has a note with override, azimuth: {int(note_json['azimuth'])}")
                 return int(note_json['azimuth'])
             
         # If no azimuth sensor data or note override exists, estimate azimuth based on child stations
-        return self.estimate_ap_azimuth(device)
+        return self.estimate_ap_azimuth(device, child_index)
 
-    def _is_infrastructure(self, device: Dict) -> bool:
-        sites = self.get_sites()
+    @staticmethod
+    def _is_infrastructure(site_id: str, site_ids: set) -> bool:
         # Implement logic to identify infrastructure devices
-        for site in sites:
-            if site.get('identification').get('type') == 'site' and site.get('identification').get('id') == device.get('identification').get('site').get('id'):
-                    return True
-        return False
+        return site_id in site_ids
 
-    def _is_airmax(self, device: Dict) -> bool:
+    @staticmethod
+    def _is_airmax(device_type: str) -> bool:
         # Implement logic to identify AirMax devices
-        if device.get('identification').get('type').lower() == 'airmax':
-            return True
-        return False
+        return device_type == 'airmax'
 
-    def _is_wave(self, device: Dict) -> bool:
+    @staticmethod
+    def _is_wave(device_type: str) -> bool:
         # Implement logic to identify Wave devices
-        if device.get('identification').get('type').lower() == 'wave':
-            return True
-        return False
+        return device_type == 'wave'
     
-    def _is_airfiber_60(self, device: Dict) -> bool:
+    @staticmethod
+    def _is_airfiber_60(device_type: str, model: str) -> bool:
         # Implement logic to identify AirFiber devices
-        if device.get('identification').get('type').lower() == 'airfiber' and 'af60' in device.get('identification').get('model').lower():
-            return True
-        return False
+        return device_type == 'airfiber' and 'af60' in model
 
-    def _is_ap(self, device: Dict) -> bool:
+    @staticmethod
+    def _is_ap(wireless_mode: str) -> bool:
         # Implement logic to identify antenna devices
-        if device.get('overview') and device.get('overview').get('wirelessMode') and 'ap-' in device.get('overview').get('wirelessMode').lower():
-            return True
-        return False
+        return 'ap-' in wireless_mode
 
-    def get_child_stations_coords(self, ap_device: Dict) -> List[Tuple[float, float]]:
+    def build_child_station_index(self, devices: List[Dict]) -> Dict[str, List[Tuple[float, float]]]:
         """
-        Get the GPS coordinates of all child stations connected to the given AP.
+        Group the GPS coordinates of every located device by the SSID it is attached to.
         
-        :param ap_device: The AP device dictionary.
-        :return: A list of (latitude, longitude) tuples for all child stations.
+        :param devices: The device list already fetched by get_aps.
+        :return: A mapping of SSID to a list of (latitude, longitude) tuples.
         """
-
-        devices = []
-        child_coords = []
-
-        # Check if devices.json exists. Should always exist since this method relies on APs being loaded.
-        if Path('devices.json').exists():
-            with open('devices.json', 'r') as f:
-                devices = json.load(f)
-        else:
-            devices = self.get_devices()
+        child_index = defaultdict(list)
 
         for device in devices:
-            if device.get('attributes') and device.get('attributes').get('ssid') == ap_device.get('attributes').get('ssid'):
-                lat = device.get('location').get('latitude')
-                lon = device.get('location').get('longitude')
-                if lat is not None and lon is not None:
-                    child_coords.append((lat, lon))
+            ssid = (device.get('attributes') or {}).get('ssid')
+            location = device.get('location') or {}
+            lat = location.get('latitude')
+            lon = location.get('longitude')
+            if ssid and lat is not None and lon is not None:
+                child_index[ssid].append((lat, lon))
 
-        return child_coords
+        return child_index
+
+    def get_child_stations_coords(self, ap_device: Dict, child_index: Dict[str, List[Tuple[float, float]]]) -> List[Tuple[float, float]]:
+        """
+        Get the GPS coordinates of all child stations connected to the given AP.
+        
+        :param ap_device: The AP device dictionary.
+        :param child_index: SSID to coordinates mapping from build_child_station_index.
+        :return: A list of (latitude, longitude) tuples for all child stations.
+        """
+        ssid = (ap_device.get('attributes') or {}).get('ssid')
+        return child_index.get(ssid, [])
 
-    def estimate_ap_azimuth(self, ap_device: Dict) -> float:
+    def estimate_ap_azimuth(self, ap_device: Dict, child_index: Dict[str, List[Tuple[float, float]]]) -> float:
         """
         Estimate the azimuth of an AP based on the spatial distribution of its child stations.
         
         :param ap_device: The AP device dictionary.
+        :param child_index: SSID to coordinates mapping from build_child_station_index.
         :return: The estimated azimuth in degrees.
         """
-        child_station_coords = self.get_child_stations_coords(ap_device)
+        child_station_coords = self.get_child_stations_coords(ap_device, child_index)
         if not child_station_coords:
             return 0.0  # Default azimuth if no child stations are available
 
@@ -159,26 +181,25 @@ class UNMSClient:
         ap_lat = ap_device['location']['latitude']
         ap_lon = ap_device['location']['longitude']
 
-        # Calculate the vectors to each child station
-        x_sum = 0
-        y_sum = 0
-        for lat, lon in child_station_coords:
-            # Convert lat/lon to radians
-            lat_rad = math.radians(lat)
-            lon_rad = math.radians(lon)
-            ap_lat_rad = math.radians(ap_lat)
-            ap_lon_rad = math.radians(ap_lon)
+        # Calculate the vectors to each child station in one pass over the arrays
+        coords = np.asarray(child_station_coords, dtype=float)
+        lat_rad = np.radians(coords[:, 0])
+        lon_rad = np.radians(coords[:, 1])
+        ap_lat_rad = math.radians(ap_lat)
+        ap_lon_rad = math.radians(ap_lon)
 
-            # Calculate the vector components
-            delta_lon = lon_rad - ap_lon_rad
-            x = math.cos(lat_rad) * math.sin(delta_lon)
-            y = math.cos(ap_lat_rad) * math.sin(lat_rad) - math.sin(ap_lat_rad) * math.cos(lat_rad) * math.cos(delta_lon)
+        # Loop invariant trig terms, evaluated once per AP / per station
+        sin_ap_lat = math.sin(ap_lat_rad)
+        cos_ap_lat = math.cos(ap_lat_rad)
+        cos_lat = np.cos(lat_rad)
 
-            x_sum += x
-            y_sum += y
+        # Calculate the vector components
+        delta_lon = lon_rad - ap_lon_rad
+        x = cos_lat * np.sin(delta_lon)
+        y = cos_ap_lat * np.sin(lat_rad) - sin_ap_lat * cos_lat * np.cos(delta_lon)
 
         # Calculate the medial radian (average direction)
-        azimuth_rad = math.atan2(x_sum, y_sum)
+        azimuth_rad = math.atan2(x.sum(), y.sum())
         azimuth_deg = math.degrees(azimuth_rad)
 
         # Normalize the azimuth to 0-360 degrees
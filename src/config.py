@@ -0,0 +1,20 @@
+# config.py
+from functools import lru_cache
+from pathlib import Path
+import yaml
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _Loader
+
+CONFIG_PATH = Path("config/config.yaml")
+
+def load_config(config_path: Path) -> dict:
+    with open(config_path) as f:
+        return yaml.load(f, Loader=_Loader)
+
+@lru_cache(maxsize=1)
+def get_config() -> dict:
+    """Parse CONFIG_PATH on first use and share the result with every later caller"""
+    return load_config(CONFIG_PATH)
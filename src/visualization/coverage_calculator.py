@@ -1,43 +1,161 @@
 import numpy as np
-from geopy import distance
-from typing import Tuple, List
-from pathlib import Path
-import asyncio
-import yaml
-import time
+import numba
+from numba import njit, prange
+from pyproj import Geod
+from typing import Tuple, List, Optional
+from functools import lru_cache
+import shapely
 import sys
-from pathlib import Path
+import threading
+from src.config import get_config
+
+# app.py launches the parallel kernels from its event loop thread, and under TBB (picked automatically
+# when installed) a launch from any thread but the main one hangs the interpreter at exit. Pin OpenMP,
+# or the workqueue layer when numba was built without it, before the first kernel runs.
+try:
+    from numba.np.ufunc import omppool  # noqa: F401
+    numba.config.THREADING_LAYER = 'omp'
+except (ImportError, OSError):
+    numba.config.THREADING_LAYER = 'workqueue'
+
 import rasterio
-import yaml
-from rasterio.transform import from_origin
+from rasterio.transform import Affine, from_origin
 from rasterio.merge import merge
 from rasterio.plot import show
 
-# Load configuration file
-def load_config(config_path: Path) -> dict:
-    with open(config_path) as f:
-        return yaml.safe_load(f)
-config = load_config(Path("config/config.yaml"))
+# Inverse of the preloaded raster transform, maps (lon, lat) to fractional (col, row)
+inv_transform = None
+
+def sample_elevations(lats, lons) -> np.ndarray:
+    """
+    Gather elevations for arrays of points from the preloaded raster array.
+
+    :param lats: Latitudes of the points.
+    :param lons: Longitudes of the points.
+    :return: Elevations with the shape of the inputs, NaN where a point falls outside the raster.
+    """
+    cols, rows = inv_transform * (np.asarray(lons, dtype=np.float64), np.asarray(lats, dtype=np.float64))
+    rows = np.floor(rows).astype(np.intp)
+    cols = np.floor(cols).astype(np.intp)
+    in_bounds = (rows >= 0) & (rows < raster_array.shape[0]) & (cols >= 0) & (cols < raster_array.shape[1])
+    elevations = np.full(np.shape(rows), np.nan)
+    elevations[in_bounds] = raster_array[rows[in_bounds], cols[in_bounds]]
+    return elevations
+
+# The workqueue threading layer cannot run parallel kernels from several threads at once
+_parallel_kernel_lock = threading.Lock()
+
+# Mean Earth radius in meters used by the spherical destination formula
+EARTH_RADIUS_M = 6371008.8
+
+@njit(cache=True, fastmath=True)
+def _destination_kernel(lat1: float, lon1: float, bearings: np.ndarray, dists: np.ndarray,
+                        out_lat: np.ndarray, out_lon: np.ndarray):
+    """
+    Compiled spherical forward solve. Angles in radians, results written in degrees into out_lat/out_lon.
+    """
+    sin_lat1 = np.sin(lat1)
+    cos_lat1 = np.cos(lat1)
+    for i in range(bearings.size):
+        delta = dists[i] / EARTH_RADIUS_M
+        sin_delta = np.sin(delta)
+        cos_delta = np.cos(delta)
+        sin_lat2 = sin_lat1 * cos_delta + cos_lat1 * sin_delta * np.cos(bearings[i])
+        lat2 = np.arcsin(sin_lat2)
+        lon2 = lon1 + np.arctan2(np.sin(bearings[i]) * sin_delta * cos_lat1, cos_delta - sin_lat1 * sin_lat2)
+        out_lat[i] = np.degrees(lat2)
+        out_lon[i] = np.degrees(lon2)
+
+def destination_points(lat: float, lon: float, bearing, distance_m):
+    """
+    Closed-form spherical-earth destination point, vectorized over bearings and distances.
 
-# Global variable to store the preloaded GeoTIFF dataset
-dataset = None
+    :param lat: Latitude of the origin point.
+    :param lon: Longitude of the origin point.
+    :param bearing: Bearing(s) in degrees clockwise from north.
+    :param distance_m: Distance(s) from the origin in meters.
+    :return: (latitudes, longitudes) in degrees, broadcast over bearing and distance.
+    """
+    bearing, distance_m = np.broadcast_arrays(np.asarray(bearing, dtype=np.float64),
+                                              np.asarray(distance_m, dtype=np.float64))
+    out_lat = np.empty(bearing.shape)
+    out_lon = np.empty(bearing.shape)
+
+    # The kernel works on flat buffers; reshape views of the outputs keep the broadcast shape
+    _destination_kernel(np.radians(lat), np.radians(lon), np.radians(bearing).ravel(),
+                        distance_m.ravel(), out_lat.reshape(-1), out_lon.reshape(-1))
+    return out_lat, out_lon
+
+@njit(fastmath=True, cache=True)
+def _walk_ray(elevation: np.ndarray, r0: float, c0: float, r1: float, c1: float,
+              ray_length_m: float, antenna_height: float, tan_downtilt: float, viewshed: np.ndarray):
+    """
+    Grid traversal (Amanatides-Woo) of one ray from (r0, c0) to (r1, c1) in pixel space. Every cell the
+    segment crosses is marked when its terrain sits at or below the highest signal height the ray reaches
+    inside that cell, so a cell holding any visible point along the ray is never left unmarked.
+    """
+    n_rows, n_cols = elevation.shape
+    dr = r1 - r0
+    dc = c1 - c0
+    row = int(np.floor(r0))
+    col = int(np.floor(c0))
+    n_cells = abs(int(np.floor(r1)) - row) + abs(int(np.floor(c1)) - col)
+
+    # Ray parameter t (0 at the origin, 1 at the end) of the next row / column boundary and the spacing
+    # between boundaries; a large finite sentinel stands in for infinity, which fastmath assumes away
+    step_r = 1 if dr > 0 else -1
+    step_c = 1 if dc > 0 else -1
+    t_delta_r = abs(1.0 / dr) if dr != 0 else 1e30
+    t_delta_c = abs(1.0 / dc) if dc != 0 else 1e30
+    t_max_r = ((row + 1 - r0) if dr > 0 else (r0 - row)) * t_delta_r if dr != 0 else 1e30
+    t_max_c = ((col + 1 - c0) if dc > 0 else (c0 - col)) * t_delta_c if dc != 0 else 1e30
+
+    # Signal drop over the whole ray, linear in t, so its highest point in a cell is at the cell's
+    # entry for a downtilt and at its exit for an uptilt
+    drop = ray_length_m * tan_downtilt
+    t_enter = 0.0
+    for _ in range(n_cells + 1):
+        t_exit = min(t_max_r, t_max_c, 1.0)
+        t_high = t_enter if drop >= 0 else t_exit
+        if 0 <= row < n_rows and 0 <= col < n_cols:
+            if elevation[row, col] <= antenna_height - drop * t_high:
+                viewshed[row, col] = 1
+        if t_max_r < t_max_c:
+            row += step_r
+            t_enter = t_max_r
+            t_max_r += t_delta_r
+        else:
+            col += step_c
+            t_enter = t_max_c
+            t_max_c += t_delta_c
 
-def get_elevation_from_dataset(dataset, lat: float, lon: float) -> float:
+@njit(parallel=True, fastmath=True, cache=True)
+def _viewshed_rays_kernel(elevation: np.ndarray, r0: float, c0: float, r1: np.ndarray, c1: np.ndarray,
+                          ray_length_m: float, antenna_height: float, tan_downtilt: float, viewshed: np.ndarray):
+    """
+    Walk every ray of one antenna from (r0, c0) to (r1[k], c1[k]), in parallel over the rays.
     """
-    Get elevation data from a preloaded GeoTIFF dataset for a given latitude and longitude.
+    for k in prange(r1.size):
+        _walk_ray(elevation, r0, c0, r1[k], c1[k], ray_length_m, antenna_height, tan_downtilt, viewshed)
 
-    :param dataset: Preloaded rasterio dataset.
-    :param lat: Latitude of the point.
-    :param lon: Longitude of the point.
-    :return: Elevation value at the given point.
+@njit(parallel=True, fastmath=True, cache=True)
+def _batch_viewshed_kernel(elevation: np.ndarray, origins: np.ndarray, ray_offsets: np.ndarray, r1: np.ndarray,
+                           c1: np.ndarray, ray_lengths_m: np.ndarray, antenna_heights: np.ndarray,
+                           tan_downtilts: np.ndarray, viewshed: np.ndarray):
+    """
+    Walk the rays of many antennas into one shared viewshed, in parallel over the antennas.
+    Antenna i owns rays ray_offsets[i]:ray_offsets[i + 1]; cells are only ever set to 1,
+    so antennas overlapping on the canvas cannot disagree.
     """
-    # Convert lat/lon to row/col in the raster
-    row, col = dataset.index(lon, lat)
-    # Get the elevation value
-    elevation = dataset.read(1)[row, col]
-    return float(elevation)
+    for i in prange(origins.shape[0]):
+        for k in range(ray_offsets[i], ray_offsets[i + 1]):
+            _walk_ray(elevation, origins[i, 0], origins[i, 1], r1[k], c1[k],
+                      ray_lengths_m[i], antenna_heights[i], tan_downtilts[i], viewshed)
 
 class CoverageCalculator:
+    # Shared WGS84 ellipsoid used for vectorized forward geodesic solves
+    geod = Geod(ellps="WGS84")
+
     def __init__(self, name: str, antenna_height: float, beamwidth: float = 60.0, beamheight: float = 30.0):
         """
         :param antenna_height: Height above ground in meters
@@ -53,111 +171,88 @@ class CoverageCalculator:
         """
         Preload the GeoTIFF file into memory as a NumPy array when the Flask app starts.
         """
-        global dataset, raster_array, raster_transform, raster_crs
+        global raster_array, raster_transform, raster_crs, inv_transform
         try:
-            with rasterio.open(config['map']['srtm_file']) as src:
+            srtm_file = get_config()['map']['srtm_file']
+            with rasterio.open(srtm_file) as src:
                 # Read the raster data into a NumPy array
                 raster_array = src.read(1)  # Read the first band (elevation data)
                 raster_transform = src.transform  # Store the transform for georeferencing
+                inv_transform = ~raster_transform  # Invert once for vectorized pixel lookups
                 raster_crs = src.crs  # Store the CRS for spatial reference
-                print(f"VIEWSHED RENDERING - Preloaded GeoTIFF file: {config['map']['srtm_file']} into memory")
+                print(f"VIEWSHED RENDERING - Preloaded GeoTIFF file: {srtm_file} into memory")
                 return src
         except Exception as e:
             print(f"Failed to preload GeoTIFF file: {e}")
             sys.exit(1)
 
-    async def get_elevation(self, lat: float, lon: float) -> float:
+    @staticmethod
+    def raster_window(west: float, south: float, east: float, north: float) -> Tuple[np.ndarray, Affine]:
         """
-        Fetch elevation data for a given latitude and longitude using windowed reads.
+        Slice the preloaded raster to a lat/lon bounding box so a batch of antennas can share one read.
+
+        :return: A view of the raster array covering the box (clipped to the raster) and its transform.
         """
-        start_time = time.time()  # Start stopwatch
-        try:
-            #print(f"[{time.time():.2f}] Task started for ({lat}, {lon})")
+        from rasterio.warp import transform_bounds
 
-            # Offload blocking rasterio operations to a separate thread                
-            def fetch_elevation():
-                # Use the preloaded dataset
-                row, col = dataset.index(lon, lat)
-                window = rasterio.windows.Window(col, row, 1, 1)
-                elevation = dataset.read(1, window=window)[0, 0]
-                return elevation
+        # Convert the box to raster pixels, padded by a pixel for datum shifts and partial cells
+        west, south, east, north = transform_bounds("EPSG:4326", raster_crs, west, south, east, north)
+        cols, rows = inv_transform * (np.array([west, east]), np.array([north, south]))
+        row_min = min(max(int(np.floor(rows.min())) - 1, 0), raster_array.shape[0])
+        row_max = min(max(int(np.ceil(rows.max())) + 1, row_min), raster_array.shape[0])
+        col_min = min(max(int(np.floor(cols.min())) - 1, 0), raster_array.shape[1])
+        col_max = min(max(int(np.ceil(cols.max())) + 1, col_min), raster_array.shape[1])
 
-            elevation_value = await asyncio.to_thread(fetch_elevation)
+        return (raster_array[row_min:row_max, col_min:col_max],
+                raster_transform * Affine.translation(col_min, row_min))
 
-            elapsed_time = time.time() - start_time  # Stop stopwatch
-            #print(f"[{time.time():.2f}] Task completed for ({lat}, {lon}) in {elapsed_time:.2f} seconds")
-            return float(elevation_value)
-        except Exception as e:
-            elapsed_time = time.time() - start_time  # Stop stopwatch
-            print(f"[{time.time():.2f}] Error fetching elevation for ({lat}, {lon}) in {elapsed_time:.2f} seconds: {e}")
-            return 0.0  # Default elevation on error
-        
-    async def calculate_viewshed(self, center_lat: float, center_lon: float,
-                                azimuth: float, downtilt: float, distance_m: float = 5000,
-                                station_height: float = 6.0) -> List[Tuple[float, float]]:
+    def calculate_viewshed(self, center_lat: float, center_lon: float,
+                           azimuth: float, downtilt: float, distance_m: float = 5000,
+                           station_height: float = 6.0) -> List[Tuple[float, float]]:
         """
         Calculate the viewshed boundary based on terrain collision points.
         """
-        azimuth_rad = np.radians(azimuth)
-        downtilt_rad = np.radians(abs(downtilt))
-        points = []
-        steps = config['map']['arc_steps']  # Number of points in the arc
-        points_per_line = config['map']['arc_radial_points']  # Number of points along each radial line
-
-        semaphore = asyncio.Semaphore(config['map']['processing_threads'])  # Limit concurrent tasks
-
-        async def fetch_with_semaphore(lat, lon):
-            async with semaphore:
-                return await self.get_elevation(lat, lon)
-
-        # Prepare tasks for asynchronous elevation fetching
-        tasks = []
-        for i in range(steps + 1):
-            angle = azimuth_rad - np.radians(self.beamwidth / 2) + np.radians(self.beamwidth) * i / steps
-            for dist in np.linspace(0, distance_m, num=points_per_line):
-                # Calculate the point's latitude and longitude
-                new_point = distance.distance(meters=dist).destination(
-                    point=(center_lat, center_lon),
-                    bearing=np.degrees(angle)
-                )
-                lat, lon = new_point.latitude, new_point.longitude
-                tasks.append(fetch_with_semaphore(lat, lon))
-
-        # Fetch elevations concurrently
-        elevations = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Process the results
-        task_index = 0
-        for i in range(steps + 1):
-            angle = azimuth_rad - np.radians(self.beamwidth / 2) + np.radians(self.beamwidth) * i / steps
-            for dist in np.linspace(0, distance_m, num=points_per_line):
-                # Calculate the point's latitude and longitude
-                new_point = distance.distance(meters=dist).destination(
-                    point=(center_lat, center_lon),
-                    bearing=np.degrees(angle)
-                )
-                lat, lon = new_point.latitude, new_point.longitude
-
-                # Get the corresponding elevation
-                elevation_result = elevations[task_index]
-                task_index += 1
-
-                # Handle exceptions in elevation results
-                if isinstance(elevation_result, Exception):
-                    print(f"Error fetching elevation for ({lat}, {lon}): {elevation_result}")
-                    continue
-
-                terrain_elevation = elevation_result
-
-                # Calculate the height of the signal at this distance
-                signal_height = self.antenna_height - (dist * np.tan(downtilt_rad))
-
-                # Check if the terrain obstructs the signal
-                if terrain_elevation > signal_height + station_height:
-                    break  # Stop adding points along this line if obstructed
-
-                # Add the point to the viewshed
-                points.append((lat, lon))
+        tan_downtilt = np.tan(np.radians(abs(downtilt)))
+        map_config = get_config()['map']
+        steps = map_config.get('arc_steps', 36)  # Number of points in the arc
+        points_per_line = map_config.get('arc_radial_points', 16)  # Number of coarse samples along each radial line
+
+        # Calculate every (ray, sample) point's latitude and longitude in one vectorized WGS84 solve
+        angles = azimuth + np.linspace(-self.beamwidth / 2, self.beamwidth / 2, steps + 1)
+        dists = np.linspace(0, distance_m, num=points_per_line)
+        bearing_grid, dist_grid = np.broadcast_arrays(angles[:, None], dists[None, :])
+        lons, lats, _ = self.geod.fwd(np.full(bearing_grid.shape, center_lon), np.full(bearing_grid.shape, center_lat),
+                                      bearing_grid, dist_grid)
+        lats = lats.astype(np.float32)
+        lons = lons.astype(np.float32)
+
+        # Clearance of the signal over the terrain at every coarse sample, negative where obstructed
+        signal_heights = self.antenna_height - dists * tan_downtilt
+        delta = signal_heights[None, :] - (sample_elevations(lats, lons) + station_height)
+
+        # First obstructed sample of every ray in one pass, samples outside the raster never obstruct
+        obstructed = delta < 0
+        hit = obstructed.any(axis=1)
+        ends = np.where(hit, obstructed.argmax(axis=1), points_per_line)
+
+        # Keep the in-raster samples before each ray's first collision
+        keep = (np.arange(points_per_line)[None, :] < ends[:, None]) & ~np.isnan(delta)
+        sample_rays, sample_cols = np.nonzero(keep)
+
+        # Refine where the signal meets the terrain between the last clear and first obstructed sample, all rays at once
+        edge_rays = np.flatnonzero(hit & (ends > 0))
+        edge_ends = ends[edge_rays]
+        edge_lats, edge_lons = self._refine_collisions(
+            center_lat, center_lon, angles[edge_rays], dists[edge_ends - 1], delta[edge_rays, edge_ends - 1],
+            dists[edge_ends], delta[edge_rays, edge_ends], tan_downtilt, station_height
+        )
+
+        # Order the samples and edge points ray by ray, each edge after its ray's visible samples
+        order = np.argsort(np.concatenate((sample_rays * (points_per_line + 1) + sample_cols,
+                                           edge_rays * (points_per_line + 1) + points_per_line)), kind="stable")
+        point_lats = np.concatenate((lats[keep], edge_lats))[order]
+        point_lons = np.concatenate((lons[keep], edge_lons))[order]
+        points = list(zip(point_lats.tolist(), point_lons.tolist()))
 
         # Include the origin point to create a radiating cone
         if self.beamwidth != 360 and self.beamwidth != 0:
@@ -165,97 +260,212 @@ class CoverageCalculator:
 
         return points
 
+    def _refine_collisions(self, center_lat: float, center_lon: float, bearings: np.ndarray,
+                           clear_dists: np.ndarray, clear_deltas: np.ndarray, hit_dists: np.ndarray, hit_deltas: np.ndarray,
+                           tan_downtilt: float, station_height: float, iterations: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Secant search, vectorized over rays, for the distance where the signal clearance crosses zero,
+        falling back to bisection wherever the secant step leaves the bracket.
+
+        :return: (latitudes, longitudes) of the last clear distance on every ray, as float32.
+        """
+        clear_dists, clear_deltas = clear_dists.astype(np.float64), clear_deltas.astype(np.float64)
+        hit_dists, hit_deltas = hit_dists.astype(np.float64), hit_deltas.astype(np.float64)
+        origin_lons = np.full(bearings.shape, center_lon)
+        origin_lats = np.full(bearings.shape, center_lat)
+
+        for _ in range(iterations):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                dists = hit_dists - hit_deltas * (hit_dists - clear_dists) / (hit_deltas - clear_deltas)
+            in_bracket = (np.minimum(clear_dists, hit_dists) < dists) & (dists < np.maximum(clear_dists, hit_dists))
+            use_secant = ~np.isnan(clear_deltas) & (clear_deltas != hit_deltas) & in_bracket
+            dists = np.where(use_secant, dists, (clear_dists + hit_dists) / 2)
+
+            lons, lats, _ = self.geod.fwd(origin_lons, origin_lats, bearings, dists)
+            deltas = (self.antenna_height - dists * tan_downtilt) - (sample_elevations(lats, lons) + station_height)
+
+            # Keep the crossing bracketed between a clear and an obstructed distance
+            obstructed = deltas < 0
+            hit_dists = np.where(obstructed, dists, hit_dists)
+            hit_deltas = np.where(obstructed, deltas, hit_deltas)
+            clear_dists = np.where(obstructed, clear_dists, dists)
+            clear_deltas = np.where(obstructed, clear_deltas, deltas)
+
+        lons, lats, _ = self.geod.fwd(origin_lons, origin_lats, bearings, clear_dists)
+        return lats.astype(np.float32), lons.astype(np.float32)
+
     def calculate_coverage_cone(self, center_lat: float, center_lon: float,
-                              azimuth: float, downtilt: float, distance_m: float = 1000) -> List[Tuple[float, float]]:
+                              azimuth: float, downtilt: float, distance_m: float = 1000) -> np.ndarray:
         """
         Calculate polygon points for the coverage area
         
         :param distance_m: Maximum distance to calculate coverage (in meters)
-        :return: List of (lat, lon) points forming the coverage polygon
+        :return: Read-only (N, 2) array of (lat, lon) points forming the coverage polygon
+        """
+        # Round the inputs so floating point noise does not defeat the cache
+        return self._cone_points(
+            round(center_lat, 5), round(center_lon, 5), round(azimuth, 5), round(downtilt, 5),
+            round(self.antenna_height, 5), round(self.beamwidth, 5), round(distance_m, 5)
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _cone_points(center_lat: float, center_lon: float, azimuth: float, downtilt: float,
+                     antenna_height: float, beamwidth: float, distance_m: float) -> np.ndarray:
+        """
+        Memoized math behind calculate_coverage_cone, keyed on the (rounded) antenna parameters.
         """
-        # Convert angles to radians
-        azimuth_rad = np.radians(azimuth)
+        # Convert downtilt to radians
         downtilt_rad = np.radians(abs(downtilt))
         
-        # Calculate the main direction point
-        points = []
         steps = 36  # Number of points in the arc
         
         # Handle downtilt = 0 to avoid division by zero
         if downtilt_rad <= 0:
             ground_distance = distance_m  # Or use a large default value
         else:
-            ground_distance = self.antenna_height / np.tan(downtilt_rad)
+            ground_distance = antenna_height / np.tan(downtilt_rad)
             #print(f"Ground distance calculated: {ground_distance} m")
 
+        # Solve every arc vertex with a single vectorized forward geodesic call
+        angles = np.linspace(azimuth - beamwidth / 2, azimuth + beamwidth / 2, steps + 1)
+        lons_in = np.full_like(angles, center_lon)
+        lats_in = np.full_like(angles, center_lat)
+        dists = np.full_like(angles, min(ground_distance, distance_m))
+        lons_out, lats_out, _ = CoverageCalculator.geod.fwd(lons_in, lats_in, angles, dists)
 
-        for i in range(steps + 1):
-            angle = azimuth_rad - np.radians(self.beamwidth/2) + np.radians(self.beamwidth) * i/steps
-            dist = min(ground_distance, distance_m)
-            
-            # Calculate new point
-            new_point = distance.distance(meters=dist).destination(
-                point=(center_lat, center_lon),
-                bearing=np.degrees(angle)
-            )
-            
-            points.append((new_point.latitude, new_point.longitude))
-        
+        points = np.column_stack((lats_out, lons_out))
 
         # Include origin point to create radiating cone (except for omnidirectional antennas)
-        if self.beamwidth != 360 and self.beamwidth != 0:
-            points.insert(0, (center_lat, center_lon))
+        if beamwidth != 360 and beamwidth != 0:
+            points = np.vstack(((center_lat, center_lon), points))
+
+        # Drop the nearly collinear arc vertices (Ramer-Douglas-Peucker), keeping the original if simplifying collapses it
+        tolerance = get_config()['map'].get('cone_simplify_tolerance', 1e-4)  # Degrees a vertex may move
+        simplified = shapely.simplify(shapely.Polygon(points[:, ::-1]), tolerance, preserve_topology=False)
+        if not simplified.is_empty and isinstance(simplified, shapely.Polygon):
+            points = np.asarray(simplified.exterior.coords)[:-1, ::-1]
 
+        # Cached results are shared between callers, so keep them immutable
+        points.flags.writeable = False
         return points
     
-    def calculate_viewshed_raster(self, center_lat: float, center_lon: float, azimuth: float, downtilt: float, distance_m: float = 8000) -> np.ndarray:
+    def _ray_pixels(self, center_lat: float, center_lon: float, azimuth: float, distance_m: float,
+                    to_pixel: Affine) -> Tuple[float, float, np.ndarray, np.ndarray, float]:
+        """
+        Pixel space origin and ray endpoints of the antenna's viewshed cone.
+
+        :return: (r0, c0, r1, c1, ray_length_m), fractional so the rays start inside the origin cell.
+        """
+        from rasterio.warp import transform
+
+        ray_length_m = min(distance_m, 8000)  # Cap distance at 8 km
+
+        origin_x, origin_y = transform("EPSG:4326", raster_crs, [center_lon], [center_lat])
+        c0, r0 = to_pixel * (origin_x[0], origin_y[0])
+
+        # Use at least one ray per pixel along the outer arc so neighbouring rays leave no gaps; pixels
+        # in a geographic CRS are narrower east-west, so size the spacing on the smaller dimension
+        if raster_crs.is_geographic:
+            pixel_size_m = min(abs(raster_transform.e), abs(raster_transform.a) * np.cos(np.radians(center_lat))) * 111320.0
+        else:
+            pixel_size_m = min(abs(raster_transform.e), abs(raster_transform.a))
+        arc_pixels = np.radians(self.beamwidth) * ray_length_m / pixel_size_m
+        num_rays = max(36, int(np.ceil(arc_pixels)) + 1)
+
+        # Only the ray endpoints go through the destination solve, the kernel walks the cells in between.
+        # The 36 sampling angles of the original point-sampled viewshed are always walked as well, so
+        # every cell it marked visible is still marked.
+        half_width = self.beamwidth / 2
+        angles = np.union1d(np.linspace(azimuth - half_width, azimuth + half_width, num=36),
+                            np.linspace(azimuth - half_width, azimuth + half_width, num=num_rays))
+        end_lats, end_lons = destination_points(center_lat, center_lon, angles, ray_length_m)
+        end_x, end_y = transform("EPSG:4326", raster_crs, end_lons, end_lats)
+        c1, r1 = to_pixel * (np.asarray(end_x), np.asarray(end_y))
+        return float(r0), float(c0), np.asarray(r1, dtype=np.float64), np.asarray(c1, dtype=np.float64), ray_length_m
+
+    @staticmethod
+    def _pixel_window(rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """
+        Bounding (row_min, row_max, col_min, col_max) of fractional pixel coordinates, clipped to shape.
+        """
+        row_min = min(max(int(np.floor(rows.min())), 0), shape[0])
+        row_max = min(max(int(np.floor(rows.max())) + 1, row_min), shape[0])
+        col_min = min(max(int(np.floor(cols.min())), 0), shape[1])
+        col_max = min(max(int(np.floor(cols.max())) + 1, col_min), shape[1])
+        return row_min, row_max, col_min, col_max
+
+    def calculate_viewshed_raster(self, center_lat: float, center_lon: float, azimuth: float, downtilt: float,
+                                  distance_m: float = 8000, elevation: Optional[np.ndarray] = None,
+                                  elevation_transform: Optional[Affine] = None) -> Tuple[np.ndarray, Affine]:
         """
         Calculate a viewshed raster within the confines of the cone using the preloaded raster array.
+
+        :param elevation: Optional sub-array of the preloaded raster shared by a batch of antennas (see raster_window).
+        :param elevation_transform: Transform of the elevation sub-array.
+        :return: The viewshed over the cone's bounding window of the raster, and that window's transform.
         """
-        from rasterio.warp import transform_bounds
+        if elevation is None:
+            elevation, elevation_transform = raster_array, raster_transform
+
+        r0, c0, r1, c1, ray_length_m = self._ray_pixels(center_lat, center_lon, azimuth, distance_m, ~elevation_transform)
+
+        # The rays are straight in pixel space, so the origin and ray endpoints bound every cell they touch
+        row_min, row_max, col_min, col_max = self._pixel_window(np.append(r1, r0), np.append(c1, c0), elevation.shape)
 
-        # Transform raster bounds to latitude/longitude
-        bounds = transform_bounds(raster_crs, "EPSG:4326", *rasterio.transform.array_bounds(
-            raster_array.shape[0], raster_array.shape[1], raster_transform
-        ))
-
-        # Create an empty viewshed array
-        viewshed = np.zeros(raster_array.shape, dtype=np.uint8)
-
-        # Iterate over the cone's area
-        for angle in np.linspace(azimuth - self.beamwidth / 2, azimuth + self.beamwidth / 2, num=36):
-            for dist in np.linspace(0, min(distance_m, 8000), num=100):  # Cap distance at 8 km
-                # Calculate the target point's lat/lon
-                target_point = distance.distance(meters=dist).destination(
-                    point=(center_lat, center_lon),
-                    bearing=angle
-                )
-                target_lat, target_lon = target_point.latitude, target_point.longitude
-
-                # Check if the target point is within the raster bounds
-                if not (bounds[0] <= target_lon <= bounds[2] and bounds[1] <= target_lat <= bounds[3]):
-                    continue  # Skip points outside the raster bounds
-
-                # Convert target lat/lon to the raster's CRS
-                try:
-                    from rasterio.warp import transform
-                    target_lon, target_lat = transform("EPSG:4326", raster_crs, [target_lon], [target_lat])
-                    target_row, target_col = rasterio.transform.rowcol(raster_transform, target_lon[0], target_lat[0])
-                except (ValueError, IndexError):
-                    continue  # Skip points that cannot be indexed
-
-                # Ensure indices are within the raster's dimensions
-                if not (0 <= target_row < raster_array.shape[0] and 0 <= target_col < raster_array.shape[1]):
-                    continue  # Skip points outside the raster dimensions
-
-                # Get the elevation at the target point
-                elevation = raster_array[target_row, target_col]
-
-                # Calculate the height of the signal at this distance
-                signal_height = self.antenna_height - (dist * np.tan(np.radians(downtilt)))
-
-                # Mark the point as visible if it is not obstructed
-                if elevation <= signal_height:
-                    viewshed[target_row, target_col] = 1
-
-        return viewshed
\ No newline at end of file
+        # Only allocate the cone's bounding window, the kernel reads a view of the same window
+        viewshed = np.zeros((row_max - row_min, col_max - col_min), dtype=np.uint8)
+        window_transform = elevation_transform * Affine.translation(col_min, row_min)
+
+        with _parallel_kernel_lock:
+            _viewshed_rays_kernel(elevation[row_min:row_max, col_min:col_max], r0 - row_min, c0 - col_min,
+                                  r1 - row_min, c1 - col_min, ray_length_m, float(self.antenna_height),
+                                  np.tan(np.radians(downtilt)), viewshed)
+
+        return viewshed, window_transform
+
+    @staticmethod
+    def batch_viewshed_raster(jobs: List[Tuple["CoverageCalculator", float, float, float, float, float]],
+                              elevation: Optional[np.ndarray] = None,
+                              elevation_transform: Optional[Affine] = None) -> Tuple[np.ndarray, Affine]:
+        """
+        Calculate the combined viewshed of many antennas with a single compiled kernel call.
+
+        :param jobs: (calculator, center_lat, center_lon, azimuth, downtilt, distance_m) per antenna.
+        :param elevation: Optional sub-array of the preloaded raster covering every job (see raster_window).
+        :param elevation_transform: Transform of the elevation sub-array.
+        :return: The merged viewshed over the union of the cones' bounding windows, and that window's transform.
+        """
+        if elevation is None:
+            elevation, elevation_transform = raster_array, raster_transform
+        to_pixel = ~elevation_transform
+
+        origins = np.empty((len(jobs), 2))
+        ray_lengths_m = np.empty(len(jobs))
+        antenna_heights = np.empty(len(jobs))
+        tan_downtilts = np.empty(len(jobs))
+        ray_offsets = np.zeros(len(jobs) + 1, dtype=np.int64)
+        rows, cols = [], []
+        for i, (calculator, center_lat, center_lon, azimuth, downtilt, distance_m) in enumerate(jobs):
+            r0, c0, r1, c1, ray_lengths_m[i] = calculator._ray_pixels(center_lat, center_lon, azimuth, distance_m, to_pixel)
+            origins[i] = (r0, c0)
+            antenna_heights[i] = calculator.antenna_height
+            tan_downtilts[i] = np.tan(np.radians(downtilt))
+            ray_offsets[i + 1] = ray_offsets[i] + r1.size
+            rows.append(r1)
+            cols.append(c1)
+        r1 = np.concatenate(rows)
+        c1 = np.concatenate(cols)
+
+        # Allocate the union of every cone's bounding window once and shift all coordinates into it
+        row_min, row_max, col_min, col_max = CoverageCalculator._pixel_window(
+            np.concatenate((r1, origins[:, 0])), np.concatenate((c1, origins[:, 1])), elevation.shape)
+        viewshed = np.zeros((row_max - row_min, col_max - col_min), dtype=np.uint8)
+        window_transform = elevation_transform * Affine.translation(col_min, row_min)
+        origins -= (row_min, col_min)
+
+        with _parallel_kernel_lock:
+            _batch_viewshed_kernel(elevation[row_min:row_max, col_min:col_max], origins, ray_offsets,
+                                   r1 - row_min, c1 - col_min, ray_lengths_m, antenna_heights, tan_downtilts, viewshed)
+
+        return viewshed, window_transform
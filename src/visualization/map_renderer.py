@@ -1,72 +1,153 @@
 # map_renderer.py
 import folium
 import numpy as np
-from scipy.ndimage import zoom
+from numba import njit
+from rasterio.enums import Resampling
 from rasterio.transform import Affine
+from rasterio.warp import transform_bounds
 from folium.plugins import HeatMap
 from folium.raster_layers import ImageOverlay
-from .models.antenna import Antenna
-from .coverage_calculator import CoverageCalculator
-from pathlib import Path
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-import yaml
+from .models.antenna import Antenna, band_position_batch, classify_batch
+from .coverage_calculator import CoverageCalculator, destination_points
+from src.config import get_config
+import matplotlib
 import rasterio
 import asyncio
-from typing import List, Tuple
+import base64
+import io
+import math
+import os
+import threading
+from bisect import bisect_right
+from cachetools import LRUCache
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
 from PIL import Image
 
-def load_config(config_path: Path) -> dict:
-    with open(config_path) as f:
-        return yaml.safe_load(f)
-    
-config = load_config(Path("config/config.yaml"))
+try:
+    import imagecodecs
+except ImportError:  # Optional, PIL encodes the viewshed PNG when it is missing
+    imagecodecs = None
+
+# Colormap per frequency band name, resolved once at import instead of on every antenna
+_CMAP_BY_BAND = {
+    'ISM': matplotlib.colormaps['hot'], # 3GHz to 7GHz - mainly concerned with 5Ghz
+    'U-NII-1': matplotlib.colormaps['spring'],
+    'U-NII-2A': matplotlib.colormaps['summer'],
+    'U-NII-2B': matplotlib.colormaps['autumn'],
+    'U-NII-2C': matplotlib.colormaps['winter'],
+    'U-NII-3': matplotlib.colormaps['gist_ncar'],
+    'U-NII-4': matplotlib.colormaps['turbo'],
+    'U-NII-5...8': matplotlib.colormaps['gist_ncar'],
+    'Vband': matplotlib.colormaps['autumn'], # 60Ghz
+}
+_HSV = matplotlib.colormaps['hsv']
+
+def _colormap_lut(colormap) -> np.ndarray:
+    """256 hex colors sampled evenly along a colormap."""
+    rgb = np.rint(colormap(np.linspace(0.0, 1.0, 256))[:, :3] * 255).astype(int)
+    return np.array(['#%02x%02x%02x' % tuple(channels) for channels in rgb])
+
+# Quantized colors per band, a frequency's color is one index into its band's table
+_LUT_BY_BAND = {band_name: _colormap_lut(colormap) for band_name, colormap in _CMAP_BY_BAND.items()}
+_HSV_LUT = _colormap_lut(_HSV)
+
+# Per-antenna values derived once per batch by MapRenderer.prepare_antenna_table
+ANTENNA_TABLE_DTYPE = np.dtype([
+    ('latitude', 'f8'), ('longitude', 'f8'), ('azimuth', 'f8'), ('downtilt', 'f8'), ('height', 'f8'),
+    ('range_m', 'f8'), ('beamwidth_h', 'f8'), ('beamwidth_v', 'f8'), ('color', 'U7'),
+])
+
+@lru_cache(maxsize=1)
+def popup_template() -> str:
+    """Coverage polygon popup with the UNMS URL baked in on first use, formatted per antenna"""
+    unms_url = get_config()['unms']['url'].replace('{', '{{').replace('}', '}}')
+    return ('<a target="_blank" rel="noopener noreferrer" href="' + unms_url +
+            '/nms/devices#id={id}&panelType=device-panel">{name}</a><br>Center: {frequency}<br>Width: {channel_width}')
+
+def coverage_style(feature: dict) -> dict:
+    """Leaflet style for a coverage polygon feature, colored by its frequency."""
+    color = feature['properties']['color']
+    return {'color': color, 'fillColor': color, 'fillOpacity': 0.2, 'weight': 1}
+
+# Layer routing as sorted, non-overlapping (low MHz, high MHz, layer key) ranges
+BAND_TABLE = [(0, 7000, '5ghz'), (55000, 72000, '60ghz')]
+_BAND_STARTS = [low for low, _, _ in BAND_TABLE]
+
+# Standard band for each range between consecutive edges (MHz), indexed by bisect_right
+_STANDARD_BAND_EDGES = (3000, 7000, 55000, 72000)
+_STANDARD_BANDS = (2400, 5000, None, 60000, None)
+
+def frequency_to_layer_key(frequency: float) -> Optional[str]:
+    """Binary search BAND_TABLE for the layer a frequency belongs to, None if it falls between bands."""
+    index = bisect_right(_BAND_STARTS, frequency) - 1
+    if index >= 0 and frequency < BAND_TABLE[index][1]:
+        return BAND_TABLE[index][2]
+    return None
+
+# Encoded viewshed overlays (or None when nothing is visible) by viewshed_cache_key, shared by every
+# MapRenderer in the process so repeated renders of the same access points skip the kernel and the encode
+_VIEWSHED_OVERLAYS = LRUCache(maxsize=512)
+_VIEWSHED_OVERLAYS_LOCK = threading.Lock()
+
+def viewshed_cache_key(jobs: list, elevation_transform: Optional[Affine] = None) -> tuple:
+    """Hashable key for a viewshed batch, inputs are quantized to 5 decimals so near-identical antennas share results."""
+    return elevation_transform, tuple(
+        (round(lat, 5), round(lon, 5), round(azimuth, 5), round(downtilt, 5), round(distance_m, 5),
+         round(calculator.antenna_height, 5), round(calculator.beamwidth, 5))
+        for calculator, lat, lon, azimuth, downtilt, distance_m in jobs
+    )
+
+def downsample_mask(mask: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Reduce a 0/1 mask by an integer factor, a cell is set if any source pixel in its block is set.
+    The mask is zero padded to a multiple of the factor so visible cells on the right and bottom edges are kept.
+    """
+    height, width = -(-mask.shape[0] // factor), -(-mask.shape[1] // factor)
+    padded = np.zeros((height * factor, width * factor), dtype=mask.dtype)
+    padded[:mask.shape[0], :mask.shape[1]] = mask
+    return padded.reshape(height, factor, width, factor).any(axis=(1, 3)).astype(np.uint8)
 
-def frequency_to_color(antenna: Antenna) -> str:
+@njit(cache=True, nogil=True)
+def _crop_and_fill(mask: np.ndarray, fill: np.ndarray):
     """
-    Map a frequency to a color based on a gradient.
-    
-    :param frequency: The frequency to map.
-    :param min_freq: The minimum frequency in the spectrum.
-    :param max_freq: The maximum frequency in the spectrum.
-    :return: A hex color string.
+    Find the bounding box of the set pixels, then fill an RGBA image of just that box.
+    Compiled without prange, it runs on the encode worker thread and releases the GIL instead.
     """
-    # Get band range
-    min_freq = antenna.frequency_band[0]
-    max_freq = antenna.frequency_band[1]
-    
-    # Normalize the frequency to a 0-1 range
-    norm = mcolors.Normalize(vmin=min_freq, vmax=max_freq)
-    
-    # Create a colormap (e.g., from blue to red)
-    band = antenna.frequency_band_name
-    if band.lower() == 'ism': # 3GHz to 7GHz - mainly concerned with 5Ghz
-        colormap = plt.cm.get_cmap('hot')
-    elif 'u-nii' in band.lower():
-        if '1' in band:
-            colormap = plt.cm.get_cmap('spring')
-        elif '2A' in band:
-            colormap = plt.cm.get_cmap('summer')
-        elif '2B' in band:
-            colormap = plt.cm.get_cmap('autumn')
-        elif '2C' in band:
-            colormap = plt.cm.get_cmap('winter')
-        elif '3' in band:
-            colormap = plt.cm.get_cmap('gist_ncar')
-        elif '4' in band:
-            colormap = plt.cm.get_cmap('turbo')
-        elif '5' in band:
-            colormap = plt.cm.get_cmap('gist_ncar')
-    elif band.lower() == 'vband': # 60Ghz   
-        colormap = plt.cm.get_cmap('autumn')
-    else:
-        colormap = plt.cm.get_cmap('hsv')
-
-    # Map the normalized frequency to a color
-    rgba_color = colormap(norm(antenna.frequency))
-    
-    # Convert the RGBA color to a hex string
-    return mcolors.to_hex(rgba_color)
+    height, width = mask.shape
+    min_row, max_row, min_col, max_col = height, -1, width, -1
+    for row in range(height):
+        for col in range(width):
+            if mask[row, col]:
+                if max_row < 0:
+                    min_row = row
+                max_row = row
+                min_col = min(min_col, col)
+                max_col = max(max_col, col)
+    if max_row < 0:
+        return np.zeros((0, 0, 4), dtype=np.uint8), -1, -1
+
+    rgba = np.zeros((max_row - min_row + 1, max_col - min_col + 1, 4), dtype=np.uint8)
+    for row in range(min_row, max_row + 1):
+        for col in range(min_col, max_col + 1):
+            if mask[row, col] == 1:
+                rgba[row - min_row, col - min_col, :] = fill
+    return rgba, min_row, min_col
+
+def crop_and_colorize(mask: np.ndarray, rgba_fill: Tuple[int, int, int, int]) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """
+    Crop a 0/1 mask to its set pixels and color them, the rest of the image is transparent.
+
+    :param mask: The viewshed mask.
+    :param rgba_fill: Color of the set pixels.
+    :return: The cropped (H, W, 4) uint8 image and the (row, col) of its top left corner in the mask.
+    """
+    rgba, min_row, min_col = _crop_and_fill(np.ascontiguousarray(mask), np.array(rgba_fill, dtype=np.uint8))
+    if min_row < 0:
+        raise ValueError("Viewshed raster is empty, cannot create image.")
+    return rgba, (min_row, min_col)
 
 class MapRenderer:
 
@@ -74,6 +155,8 @@ class MapRenderer:
         self.map = folium.Map(location=[center_lat, center_lon], tiles="Cartodb Positron", zoom_start=zoom_start)
         # Preload dataset to be used for elevation data
         self.dataset = CoverageCalculator.preload_tiff()
+        # CRS read on every viewshed save, resolved once
+        self._crs = self.dataset.crs
 
         # Add an elevation layer if requested
         folium.TileLayer(
@@ -87,83 +170,242 @@ class MapRenderer:
         self.layer_60ghz = folium.FeatureGroup(name="60GHz Radios", show=True)
         self.layer_5ghz = folium.FeatureGroup(name="5GHz Radios", show=False)
         self.layer_2ghz = folium.FeatureGroup(name="2.4GHz Radios")
+        self.layers = {'60ghz': self.layer_60ghz, '5ghz': self.layer_5ghz, '2ghz': self.layer_2ghz}
+
+        # Calculators shared by antennas with the same height and beam shape
+        self._calc_cache: dict[tuple, CoverageCalculator] = {}
+
+        # Coverage polygon GeoJSON features per layer key, added to the layers in finalize_map
+        self._features: Dict[str, list] = defaultdict(list)
+
+        # Viewshed jobs waiting for the next batch kernel call
+        self._pending_viewsheds: list = []
+
+    def _get_calculator(self, name: str, row: np.void) -> CoverageCalculator:
+        """Return a shared CoverageCalculator for an antenna table row's height and beamwidths"""
+        key = (round(row['height'], 2), round(row['beamwidth_h'], 2), round(row['beamwidth_v'], 2))
+        calculator = self._calc_cache.get(key)
+        if calculator is None:
+            calculator = CoverageCalculator(
+                name=name,
+                antenna_height=row['height'],
+                beamwidth=row['beamwidth_h'],
+                beamheight=row['beamwidth_v']
+            )
+            self._calc_cache[key] = calculator
+        return calculator
+
+    async def render_all(self, antennas: List[Antenna], max_concurrency: Optional[int] = None):
+        """
+        Add coverage for every antenna, rendering up to max_concurrency geographic clusters at once.
 
-    async def add_antenna_directional_cone(self, antenna: Antenna):
-        """Add a coverage cone for a single antenna asynchronously."""
+        :param antennas: Antennas to render.
+        :param max_concurrency: Clusters in flight at once, defaults to the CPU count.
+        """
+        # Drop antennas that cannot be tabulated up front, they would otherwise fail their whole cluster
+        antennas = self._renderable_antennas(antennas)
+        semaphore = asyncio.Semaphore(max_concurrency or os.cpu_count() or 1)
+
+        async def run(cluster: List[Antenna]):
+            async with semaphore:
+                return await self._render_batch(cluster)
+
+        overlays = await asyncio.gather(*(run(cluster) for cluster in self._cluster_antennas(antennas).values()))
+
+        # Add the overlays in cluster order so the map does not depend on which encode finished first
+        for overlay in overlays:
+            if overlay is not None:
+                self.add_viewshed_to_map(*overlay)
+
+    @staticmethod
+    def _renderable_antennas(antennas: List[Antenna]) -> List[Antenna]:
+        """Return the antennas with finite geometry and a known model, logging and skipping the rest."""
+        renderable = []
+        for antenna in antennas:
+            try:
+                for field in ('latitude', 'longitude', 'azimuth', 'downtilt', 'height'):
+                    value = getattr(antenna, field)
+                    if value is None or not math.isfinite(value):
+                        raise ValueError(f"{field} is {value}")
+                # Resolve the model lookups here so a missing model or antenna record is caught per antenna
+                antenna.model_range_m, antenna.beamwidth_horizontal, antenna.beamwidth_vertical
+            except Exception as e:
+                print(f"Error calculating coverage for {antenna.name}: {e}")
+                continue
+            renderable.append(antenna)
+        return renderable
+
+    @staticmethod
+    def prepare_antenna_table(antennas: List[Antenna]) -> np.ndarray:
+        """
+        Derive the per-antenna rendering inputs for a whole batch in one pass.
+
+        :param antennas: Antennas to render.
+        :return: Structured array of ANTENNA_TABLE_DTYPE, one row per antenna. The color is
+                 empty for antennas outside the known frequency bands.
+        """
+        table = np.zeros(len(antennas), dtype=ANTENNA_TABLE_DTYPE)
+        if not antennas:
+            return table
+
+        table['latitude'] = [antenna.latitude for antenna in antennas]
+        table['longitude'] = [antenna.longitude for antenna in antennas]
+        table['azimuth'] = [antenna.azimuth for antenna in antennas]
+        table['downtilt'] = [antenna.downtilt for antenna in antennas]
+        table['height'] = [antenna.height for antenna in antennas]
+        table['range_m'] = [antenna.model_range_m for antenna in antennas]
+        table['beamwidth_h'] = [antenna.beamwidth_horizontal for antenna in antennas]
+        table['beamwidth_v'] = [antenna.beamwidth_vertical for antenna in antennas]
+
+        # Classify and normalize every frequency at once, then index each band's color table for all of its antennas
+        frequencies = np.array([antenna.frequency for antenna in antennas], dtype=float)
+        band_names = classify_batch(frequencies)
+        positions = band_position_batch(frequencies)
+        for band_name in set(band_names) - {None}:
+            in_band = band_names == band_name
+            indices = np.clip((positions[in_band] * 255).astype(int), 0, 255)
+            table['color'][in_band] = _LUT_BY_BAND.get(band_name, _HSV_LUT)[indices]
+        return table
+
+    @staticmethod
+    def _cluster_antennas(antennas: List[Antenna], cell_deg: float = 0.1) -> Dict[Tuple[int, int], List[Antenna]]:
+        """Bucket antennas into a lat/lon grid (~11 km cells) so nearby sites share an elevation window."""
+        clusters = defaultdict(list)
+        for antenna in antennas:
+            clusters[(int(antenna.latitude // cell_deg), int(antenna.longitude // cell_deg))].append(antenna)
+        return clusters
+
+    async def _render_batch(self, antennas: List[Antenna]):
+        """Render a cluster of antennas against a single elevation window covering all of their viewsheds."""
+        elevation, elevation_transform = None, None
+        table = self.prepare_antenna_table(antennas)
+
+        # Union of the viewshed extents, the viewshed raster caps its range at 8 km
+        aps = [row for antenna, row in zip(antennas, table) if 'AP' in antenna.name]
+        if aps:
+            extents = np.array([
+                destination_points(row['latitude'], row['longitude'], [0.0, 90.0, 180.0, 270.0],
+                                   min(row['range_m'], 8000))
+                for row in aps
+            ])
+            lats, lons = extents[:, 0], extents[:, 1]
+            elevation, elevation_transform = CoverageCalculator.raster_window(lons.min(), lats.min(), lons.max(), lats.max())
+
+        for antenna, row in zip(antennas, table):
+            await self.add_antenna_directional_cone(antenna, row)
+
+        # Take the cluster's jobs before yielding so concurrent clusters never share a batch
+        jobs, self._pending_viewsheds = self._pending_viewsheds, []
+        if not jobs:
+            return None
+
+        # Keep the event loop free while the kernel and the PNG encoding run; _parallel_kernel_lock
+        # serializes the kernel calls, so one cluster's encode overlaps with the next cluster's kernel
+        return await asyncio.to_thread(self._viewshed_overlay, jobs, elevation, elevation_transform)
+
+    def _render_viewsheds(self, elevation: Optional[np.ndarray] = None, elevation_transform: Optional[Affine] = None):
+        """Compute every queued viewshed in a single batch kernel call and add the merged result as one overlay."""
+        jobs, self._pending_viewsheds = self._pending_viewsheds, []
+        if not jobs:
+            return
+
+        overlay = self._viewshed_overlay(jobs, elevation, elevation_transform)
+        if overlay is not None:
+            self.add_viewshed_to_map(*overlay)
+
+    def _viewshed_overlay(self, jobs: list, elevation: Optional[np.ndarray] = None,
+                          elevation_transform: Optional[Affine] = None) -> Optional[Tuple[str, list]]:
+        """Return the cached or freshly encoded overlay for a batch of viewshed jobs, None if nothing is visible."""
+        key = viewshed_cache_key(jobs, elevation_transform)
+        with _VIEWSHED_OVERLAYS_LOCK:
+            if key in _VIEWSHED_OVERLAYS:
+                return _VIEWSHED_OVERLAYS[key]
+
+        # Encode the viewshed as an in-memory PNG
+        overlay = None
+        viewshed, viewshed_transform = self._compute_viewsheds(jobs, elevation, elevation_transform)
+        if viewshed is not None:
+            overlay = self._save_viewshed_as_image(viewshed, viewshed_transform)
+        with _VIEWSHED_OVERLAYS_LOCK:
+            _VIEWSHED_OVERLAYS[key] = overlay
+        return overlay
+
+    @staticmethod
+    def _compute_viewsheds(jobs: list, elevation: Optional[np.ndarray] = None,
+                           elevation_transform: Optional[Affine] = None) -> Tuple[Optional[np.ndarray], Optional[Affine]]:
+        """Run the batch kernel over the jobs, (None, None) if no cell is visible."""
+        viewshed, viewshed_transform = CoverageCalculator.batch_viewshed_raster(jobs, elevation, elevation_transform)
+        if not viewshed.any():
+            print(f"Viewshed raster for {len(jobs)} access points is empty, skipping overlay.")
+            return None, None
+        return viewshed, viewshed_transform
+
+    async def add_antenna_directional_cone(self, antenna: Antenna, row: Optional[np.void] = None):
+        """Add a coverage cone for a single antenna asynchronously, queueing its viewshed for the next batch."""
         try:
+            # Precomputed values from prepare_antenna_table, derived here when called for a lone antenna
+            if row is None:
+                row = self.prepare_antenna_table([antenna])[0]
+
             # Debugging: Log antenna details
             print(f"Processing antenna: {antenna.name}, Lat: {antenna.latitude}, Lon: {antenna.longitude}, Azimuth: {antenna.azimuth}")
 
-            # Initialize the CoverageCalculator
-            calculator = CoverageCalculator(
-                name=antenna.name,
-                antenna_height=antenna.height,
-                beamwidth=antenna.beamwidth_horizontal,
-                beamheight=antenna.beamwidth_vertical
-            )
+            # Reuse a CoverageCalculator for this antenna's geometry
+            calculator = self._get_calculator(antenna.name, row)
+            range_m = row['range_m']
 
             # Calculate the coverage polygon
-            coverage_points = await asyncio.to_thread(
-                calculator.calculate_coverage_cone,
-                antenna.latitude,
-                antenna.longitude,
-                antenna.azimuth,
-                antenna.downtilt,
-                antenna._model_range_m()
+            coverage_points = calculator.calculate_coverage_cone(
+                row['latitude'],
+                row['longitude'],
+                row['azimuth'],
+                row['downtilt'],
+                range_m
             )
             if coverage_points is None:
                 raise ValueError(f"Coverage points calculation returned None for antenna: {antenna.name}")
 
             # Only calculate and render viewshed for PTMP APs. Naming convention includes 'AP' in the name.
-            viewshed_png = f"tmp/viewshed_{antenna.name}.png"
             if 'AP' in antenna.name:
-                # Only calculate and render viewshed if viewshed PNG does not exist
-                if not Path(viewshed_png).exists():
-
-                    # Calculate the viewshed raster
-                    viewshed = await asyncio.to_thread(
-                        calculator.calculate_viewshed_raster,
-                        antenna.latitude,
-                        antenna.longitude,
-                        antenna.azimuth,
-                        antenna.downtilt,
-                        antenna._model_range_m()
-                    )
-                    if viewshed is None:
-                        raise ValueError(f"Viewshed raster calculation returned None for antenna: {antenna.name}")
-
-                    # Save the viewshed raster as an image if Access Point
-                    await self._save_viewshed_as_image(viewshed, viewshed_png, coverage_points)  
-            
-                # Add viewshed PNG to the map
-                await self.add_viewshed_to_map(viewshed_png, coverage_points)
-
-            # Add the polygon to the map
-            fill_color = frequency_to_color(antenna)
-            polygon = folium.Polygon(
-                locations=coverage_points,
-                color=fill_color,
-                fill=True,
-                fill_opacity=0.2,
-                weight=1,
-                popup=f"<a target=\"_blank\" rel=\"noopener noreferrer\" href=\"{config['unms']['url']}/nms/devices#id={antenna.id}&panelType=device-panel\">{antenna.name}</a><br>Center: {antenna.frequency}<br>Width: {antenna.channel_width}"
-            )
-            if antenna.frequency < 7000:
-                self.layer_5ghz.add_child(polygon)
-            elif 55000 <= antenna.frequency < 72000:
-                self.layer_60ghz.add_child(polygon)
+                self._pending_viewsheds.append(
+                    (calculator, row['latitude'], row['longitude'], row['azimuth'], row['downtilt'], range_m)
+                )
+
+            # Queue the polygon as a GeoJSON feature, each band's features are added as one layer in finalize_map
+            layer_key = frequency_to_layer_key(antenna.frequency)
+            if layer_key is not None:
+                if not row['color']:
+                    raise ValueError(f"Frequency {antenna.frequency} MHz is outside the known bands")
+                # GeoJSON rings are closed and ordered (lon, lat)
+                ring = np.vstack((coverage_points, coverage_points[:1]))[:, ::-1]
+                self._features[layer_key].append({
+                    'type': 'Feature',
+                    'geometry': {'type': 'Polygon', 'coordinates': [ring.tolist()]},
+                    'properties': {
+                        'color': str(row['color']),
+                        'popup': popup_template().format(id=antenna.id, name=antenna.name,
+                                                         frequency=antenna.frequency, channel_width=antenna.channel_width)
+                    }
+                })
 
         except Exception as e:
             print(f"Error calculating coverage for {antenna.name}: {e}")
 
     def downsample_raster(self, raster: np.ndarray, scale: float) -> np.ndarray:
         """
-        Downsample a raster array by a given scale factor.
+        Downsample a raster array by a given scale factor with a block reduce.
+        Boolean masks keep a cell if any source pixel in its block is set, other rasters (integer ones included)
+        take the block mean.
         :param raster: The original raster array.
         :param scale: The scale factor (e.g., 0.5 to reduce resolution by half).
         :return: The downsampled raster array.
         """
-        return zoom(raster, zoom=scale, order=1)  # Use bilinear interpolation (order=1)
+        factor = max(int(round(1 / scale)), 1)
+        if raster.dtype == np.bool_:
+            return downsample_mask(raster, factor)
+        height, width = raster.shape[0] // factor, raster.shape[1] // factor
+        blocks = raster[:height * factor, :width * factor].reshape(height, factor, width, factor)
+        return blocks.mean(axis=(1, 3))
 
     def adjust_transform(self, original_transform: Affine, scale: float) -> Affine:
         """
@@ -174,20 +416,21 @@ class MapRenderer:
         """
         return original_transform * Affine.scale(1 / scale, 1 / scale)
     
-    async def _save_viewshed_raster(self, viewshed, filepath, scale=0.5):
+    async def _save_viewshed_raster(self, viewshed, transform, filepath, scale=0.5):
         """
         Save the viewshed raster as a GeoTIFF asynchronously, with optional downsampling.
         :param viewshed: The original viewshed raster array.
+        :param transform: The transform of the viewshed window.
         :param filepath: The file path to save the raster.
         :param scale: The scale factor for downsampling (default is 0.5).
         """
-        # Downsample the raster
-        downsampled_viewshed = zoom(viewshed, zoom=scale, order=1)  # Bilinear interpolation
+        # Downsample the raster as a mask, so a block with any visible cell stays visible
+        downsampled_viewshed = self.downsample_raster(viewshed.astype(bool), scale)
 
         # Adjust the transform for the downsampled raster
-        downsampled_transform = self.adjust_transform(self.dataset.transform, scale)
+        downsampled_transform = self.adjust_transform(transform, scale)
 
-        # Save the downsampled raster
+        # Save the downsampled raster as a tiled, PackBits compressed mask, nearly free on mostly empty viewsheds
         with rasterio.open(
             filepath,
             "w",
@@ -196,57 +439,53 @@ class MapRenderer:
             width=downsampled_viewshed.shape[1],
             count=1,
             dtype=np.uint8,
-            crs=self.dataset.crs,
+            crs=self._crs,
             transform=downsampled_transform,
+            tiled=True,
+            blockxsize=256,
+            blockysize=256,
+            compress="packbits",
+            nodata=0,
         ) as dst:
             dst.write(downsampled_viewshed, 1)
 
+            # Nearest neighbour overviews keep the reduced levels binary
+            dst.build_overviews([2, 4, 8], Resampling.nearest)
+            dst.update_tags(ns="rio_overview", resampling="nearest")
+
     def _get_frequency_band(self, frequency: float) -> int:
         """Round frequency to nearest standard band"""
-        if frequency < 3000:
-            return 2400
-        elif 3000 <= frequency < 7000:
-            return 5000
-        elif 55000 <= frequency < 72000:
-            return 60000
+        return _STANDARD_BANDS[bisect_right(_STANDARD_BAND_EDGES, frequency)]
     
-    async def _save_viewshed_as_image(self, viewshed: np.ndarray, output_path: str, coverage_points: List[Tuple[float, float]]):
+    def _save_viewshed_as_image(self, viewshed: np.ndarray, transform: Affine) -> Tuple[str, list]:
         """
-        Save the viewshed raster as a transparent green image, cropped to remove empty space.
+        Encode the viewshed raster as a transparent green PNG, cropped to remove empty space.
+        :param viewshed: The viewshed window returned by calculate_viewshed_raster.
+        :param transform: The transform of the viewshed window.
+        :return: The PNG as a base64 data URI that ImageOverlay embeds without touching disk,
+                 and the [(south, west), (north, east)] bounds of the cropped image.
         """
-        def create_cropped_image():
-            # Find the bounding box of non-zero pixels
-            non_zero_rows, non_zero_cols = np.nonzero(viewshed)
-            if len(non_zero_rows) == 0 or len(non_zero_cols) == 0:
-                raise ValueError("Viewshed raster is empty, cannot create image.")
-
-            # Calculate the bounding box
-            min_row, max_row = non_zero_rows.min(), non_zero_rows.max()
-            min_col, max_col = non_zero_cols.min(), non_zero_cols.max()
-
-            # Crop the viewshed array
-            cropped_viewshed = viewshed[min_row:max_row + 1, min_col:max_col + 1]
-
-            # Create the cropped image
-            height, width = cropped_viewshed.shape
-            image = Image.new("RGBA", (width, height), (0, 0, 0, 0))  # Fully transparent background
-            for row in range(height):
-                for col in range(width):
-                    if cropped_viewshed[row, col] == 1:  # Visible point
-                        image.putpixel((col, row), (0, 255, 0, 128))  # Green with 50% transparency
-
-            # Save the cropped image
-            image.save(output_path, "PNG")
-
-            # Return the bounding box for further use
-            return min_row, max_row, min_col, max_col
-
-        # Offload the image creation to a separate thread
-        min_row, max_row, min_col, max_col = await asyncio.to_thread(create_cropped_image)
-
-        # Adjust the coverage points to reflect the cropped area
-        # (Optional: You can use this bounding box to adjust map bounds if needed)
-
+        # Crop to the visible pixels and color them green with 50% transparency on a fully transparent background
+        rgba, (min_row, min_col) = crop_and_colorize(viewshed, (0, 255, 0, 128))
+        height, width = rgba.shape[:2]
+
+        # Encode the cropped image in memory, fast compression since it is rebuilt on every render
+        if imagecodecs is not None:
+            png = imagecodecs.png_encode(rgba, level=1)
+        else:
+            buffer = io.BytesIO()
+            Image.fromarray(rgba, "RGBA").save(buffer, format="PNG", compress_level=1)
+            png = buffer.getvalue()
+        image_uri = "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+        # Georeference the cropped image from the window transform
+        crop_transform = self.adjust_transform_for_crop(transform, min_row, min_col)
+        west, north = crop_transform * (0, 0)
+        east, south = crop_transform * (width, height)
+        west, south, east, north = transform_bounds(self._crs, "EPSG:4326", west, south, east, north)
+        return image_uri, [(south, west), (north, east)]
+
+    @staticmethod
     def adjust_transform_for_crop(original_transform: Affine, min_row: int, min_col: int) -> Affine:
         """
         Adjust the raster transform for the cropped area.
@@ -257,20 +496,22 @@ class MapRenderer:
         """
         return original_transform * Affine.translation(min_col, min_row)
 
-    async def add_viewshed_to_map(self, viewshed_image_path: str, bounds: List[Tuple[float, float]]):
+    def add_viewshed_to_map(self, viewshed_image: str, bounds: Sequence[Tuple[float, float]]):
         """
         Add the viewshed image to the map as an overlay.
-        :param viewshed_image_path: Path to the viewshed image file.
+        :param viewshed_image: Data URI (or path) of the viewshed PNG.
         :param bounds: The geographical bounds of the viewshed image (southwest and northeast corners).
         """
         # Calculate bounds if not already in the correct format
         if len(bounds) > 2:
-            lats, lons = zip(*bounds)
-            bounds = [(min(lats), min(lons)), (max(lats), max(lons))]
+            points = np.asarray(bounds)
+            min_lat, min_lon = points.min(axis=0).tolist()
+            max_lat, max_lon = points.max(axis=0).tolist()
+            bounds = [(min_lat, min_lon), (max_lat, max_lon)]
 
         # Add the image overlay to the map
         folium.raster_layers.ImageOverlay(
-            image=viewshed_image_path,
+            image=viewshed_image,
             bounds=bounds,
             opacity=0.5,  # Adjust transparency
             name="Viewshed"
@@ -278,9 +519,20 @@ class MapRenderer:
 
     def finalize_map(self):
         """Finalize the map by adding layers and controls"""
+        # Render viewsheds queued by antennas added outside render_all
+        self._render_viewsheds()
+
+        # Add every band's coverage polygons to its layer as a single GeoJSON FeatureCollection
+        for layer_key, features in self._features.items():
+            folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': features},
+                style_function=coverage_style,
+                popup=folium.GeoJsonPopup(fields=['popup'], labels=False)
+            ).add_to(self.layers[layer_key])
+
         # Add the feature groups to the map only if they contain features
-        print(f"60GHz Layer contains {int(len(self.layer_60ghz._children))} infrastructure access points.")
-        print(f"5GHz Layer contains {int(len(self.layer_5ghz._children))} infrastructure access points.")
+        print(f"60GHz Layer contains {len(self._features['60ghz'])} infrastructure access points.")
+        print(f"5GHz Layer contains {len(self._features['5ghz'])} infrastructure access points.")
         if len(self.layer_60ghz._children) > 0:
             self.layer_60ghz.add_to(self.map)
         if len(self.layer_5ghz._children) > 0:
@@ -293,8 +545,13 @@ class MapRenderer:
 
         print("Map finalized with layers and controls.")
 
+    def render_html_bytes(self) -> bytes:
+        """Render the finalized map to UTF-8 encoded HTML without touching disk"""
+        return self.map.get_root().render().encode('utf-8')
+
     def save_map(self, filename: str):
-        """Write map object to object file"""
-        with open('debug/debug-map.json', 'w') as f:
-            f.write(self.map.to_json())
-        self.map.save(filename)
\ No newline at end of file
+        """Write map object to object file, with a JSON dump of the map tree when DEBUG_MAP is set"""
+        if os.environ.get("DEBUG_MAP"):
+            Path('debug/debug-map.json').write_text(self.map.to_json())
+        # Render the template once and write it out
+        Path(filename).write_bytes(self.render_html_bytes())
\ No newline at end of file
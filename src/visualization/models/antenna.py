@@ -1,6 +1,78 @@
 from dataclasses import dataclass
+from bisect import bisect_right
+from functools import cached_property
 from typing import Optional, Tuple, List
 import math
+import numpy as np
+
+# Upper edges (MHz, exclusive) of the frequency ranges classified below
+_BAND_EDGES = (3000, 5150, 5250, 5350, 5470, 5725, 5850, 5925, 7125, 58000, 70000)
+
+# (band range, band name) for each range between consecutive edges, indexed by bisect_right(_BAND_EDGES, frequency)
+_BAND_INFO = (
+    ((2400, 2495), "ISM"),          # ISM 2.4GHz band
+    (None, None),
+    ((5150, 5250), "U-NII-1"),
+    ((5250, 5350), "U-NII-2A"),
+    ((5350, 5470), "U-NII-2B"),
+    ((5470, 5725), "U-NII-2C"),
+    ((5725, 5850), "U-NII-3"),
+    ((5850, 5925), "U-NII-4"),
+    ((5925, 7125), "U-NII-5...8"),  # U-NII-5 through U-NII-8
+    (None, None),
+    ((58000, 70000), "Vband"),      # 60GHz band
+    (None, None),
+)
+_BAND_NAMES = np.array([name for _, name in _BAND_INFO], dtype=object)
+_BAND_LOWS = np.array([band[0] if band else np.nan for band, _ in _BAND_INFO])
+_BAND_HIGHS = np.array([band[1] if band else np.nan for band, _ in _BAND_INFO])
+
+# 60GHz channel number by center frequency (MHz)
+_CHAN60 = {
+    58320: 1, 60480: 2, 62640: 3, 64800: 4, 66960: 5, 69120: 6,
+}
+
+# 5GHz channel number by (channel width, center frequency) in MHz
+_CHAN5 = {
+    (20, 5180): 36, (20, 5200): 40, (20, 5220): 44, (20, 5240): 48,
+    (20, 5260): 52, (20, 5280): 56, (20, 5300): 60, (20, 5320): 64,
+    (20, 5500): 100, (20, 5520): 104, (20, 5540): 108, (20, 5560): 112,
+    (20, 5580): 116, (20, 5600): 120, (20, 5620): 124, (20, 5640): 128,
+    (20, 5660): 132, (20, 5680): 136, (20, 5700): 140, (20, 5720): 144,
+    (20, 5745): 149, (20, 5765): 153, (20, 5785): 157, (20, 5805): 161,
+    (20, 5825): 165, (20, 5845): 169,
+    (40, 5190): 38, (40, 5230): 46, (40, 5270): 54, (40, 5310): 62,
+    (40, 5350): 70, (40, 5390): 78, (40, 5430): 86, (40, 5470): 94,
+    (40, 5510): 102, (40, 5550): 110, (40, 5590): 118, (40, 5630): 126,
+    (40, 5670): 134, (40, 5710): 142, (40, 5755): 151, (40, 5795): 159,
+    (40, 5835): 167, (40, 5875): 175,
+    (80, 5210): 42, (80, 5290): 58, (80, 5370): 74, (80, 5450): 90,
+    (80, 5530): 106, (80, 5610): 122, (80, 5690): 138, (80, 5775): 155,
+    (80, 5855): 171,
+    (160, 5530): 106, (160, 5610): 122, (160, 5690): 138, (160, 5775): 155,
+    (160, 5855): 171,
+}
+
+def classify_batch(frequencies) -> np.ndarray:
+    """
+    Classify many frequencies at once.
+
+    :param frequencies: Frequencies in MHz.
+    :return: Band names (None outside the known bands), same shape as the input.
+    """
+    return _BAND_NAMES[np.searchsorted(_BAND_EDGES, frequencies, side='right')]
+
+def band_position_batch(frequencies) -> np.ndarray:
+    """
+    Locate many frequencies within their bands at once.
+
+    :param frequencies: Frequencies in MHz.
+    :return: Position of each frequency within its band range (0-1), NaN outside the known bands.
+    """
+    frequencies = np.asarray(frequencies, dtype=float)
+    indices = np.searchsorted(_BAND_EDGES, frequencies, side='right')
+    lows, highs = _BAND_LOWS[indices], _BAND_HIGHS[indices]
+    return (frequencies - lows) / (highs - lows)
 
 @dataclass
 class Antenna:
@@ -26,208 +98,38 @@ class Antenna:
         """Return (latitude, longitude) tuple"""
         return (self.latitude, self.longitude)
     
-    @property
+    @cached_property
     def frequency_band(self) -> Tuple[int, int]:
         """Return the general frequency band"""
-        if self.frequency < 3000: # 2.4GHz band 
-            return [2400, 2495]
-        elif 5150 <= self.frequency < 5250: # U-NII-1
-            return [5150, 5250]
-        elif 5250 <= self.frequency < 5350: # U-NII-2A
-            return [5250, 5350]
-        elif 5350 <= self.frequency < 5470: # U-NII-2B
-            return [5350, 5470]
-        elif 5470 <= self.frequency < 5725: # U-NII-2C
-            return [5470, 5725]
-        elif 5725 <= self.frequency < 5850: # U-NII-3
-            return [5725, 5850]
-        elif 5850 <= self.frequency < 5925: # U-NII-4
-            return [5850, 5925]
-        elif 5925 <= self.frequency < 7125: # U-NII-5 through U-NII-8
-            return [5925, 7125]
-        elif 58000 <= self.frequency < 70000: # 60GHz band
-            return [58000, 70000]
-        return None
+        return _BAND_INFO[bisect_right(_BAND_EDGES, self.frequency)][0]
     
-    @property
-    def frequency_band_name(self) -> Tuple[int, int]:
+    @cached_property
+    def frequency_band_name(self) -> str:
         """Return the general frequency band"""
-        if self.frequency < 3000: # ISM 2.4GHz band 
-            return "ISM"
-        elif 5150 <= self.frequency < 5250: # U-NII-1
-            return "U-NII-1"
-        elif 5250 <= self.frequency < 5350: # U-NII-2A
-            return "U-NII-2A"
-        elif 5350 <= self.frequency < 5470: # U-NII-2B
-            return "U-NII-2B"
-        elif 5470 <= self.frequency < 5725: # U-NII-2C
-            return "U-NII-2C"
-        elif 5725 <= self.frequency < 5850: # U-NII-3
-            return "U-NII-3"
-        elif 5850 <= self.frequency < 5925: # U-NII-4
-            return "U-NII-4"
-        elif 5925 <= self.frequency < 7125: # U-NII-5 through U-NII-8
-            return "U-NII-5...8"
-        elif 58000 <= self.frequency < 70000: # 60GHz band
-            return "Vband"
-        return None
+        return _BAND_INFO[bisect_right(_BAND_EDGES, self.frequency)][1]
 
     @property
     def channel_60(self) -> str:
         """Return operating 60Ghz channel identifier"""
-        if self.frequency == 58320:
-            return 1
-        elif self.frequency == 60480:
-            return 2
-        elif self.frequency == 62640:
-            return 3
-        elif self.frequency == 64800:
-            return 4
-        elif self.frequency == 66960:
-            return 5
-        elif self.frequency == 69120:
-            return 6
-        else:
-            return None
+        return _CHAN60.get(self.frequency)
         
     @property
     def channel_5(self) -> str:
         """Return operating 5Ghz channel identifier"""
-        if self.channel_width == 20:
-            if self.frequency == 5180:
-                return 36
-            elif self.frequency == 5200:
-                return 40
-            elif self.frequency == 5220:
-                return 44
-            elif self.frequency == 5240:
-                return 48
-            elif self.frequency == 5260:
-                return 52
-            elif self.frequency == 5280:
-                return 56
-            elif self.frequency == 5300:    
-                return 60
-            elif self.frequency == 5320:
-                return 64
-            elif self.frequency == 5500:
-                return 100
-            elif self.frequency == 5520:
-                return 104
-            elif self.frequency == 5540:
-                return 108
-            elif self.frequency == 5560:
-                return 112
-            elif self.frequency == 5580:
-                return 116
-            elif self.frequency == 5600:
-                return 120
-            elif self.frequency == 5620:
-                return 124
-            elif self.frequency == 5640:
-                return 128
-            elif self.frequency == 5660:
-                return 132
-            elif self.frequency == 5680:
-                return 136
-            elif self.frequency == 5700:
-                return 140
-            elif self.frequency == 5720:
-                return 144
-            elif self.frequency == 5745:
-                return 149
-            elif self.frequency == 5765:
-                return 153
-            elif self.frequency == 5785:
-                return 157
-            elif self.frequency == 5805:    
-                return 161
-            elif self.frequency == 5825:
-                return 165
-            elif self.frequency == 5845:
-                return 169
-        elif self.channel_width == 40:
-            if self.frequency == 5190:
-                return 38
-            elif self.frequency == 5230:
-                return 46
-            elif self.frequency == 5270:
-                return 54
-            elif self.frequency == 5310:    
-                return 62
-            elif self.frequency == 5350:
-                return 70
-            elif self.frequency == 5390:
-                return 78
-            elif self.frequency == 5430:
-                return 86
-            elif self.frequency == 5470:
-                return 94
-            elif self.frequency == 5510:    
-                return 102
-            elif self.frequency == 5550:
-                return 110
-            elif self.frequency == 5590:
-                return 118
-            elif self.frequency == 5630:
-                return 126
-            elif self.frequency == 5670:
-                return 134
-            elif self.frequency == 5710:
-                return 142
-            elif self.frequency == 5755:
-                return 151
-            elif self.frequency == 5795:
-                return 159
-            elif self.frequency == 5835:
-                return 167
-            elif self.frequency == 5875:
-                return 175
-        elif self.channel_width == 80:
-            if self.frequency == 5210:
-                return 42
-            elif self.frequency == 5290:
-                return 58
-            elif self.frequency == 5370:
-                return 74
-            elif self.frequency == 5450:
-                return 90
-            elif self.frequency == 5530:
-                return 106
-            elif self.frequency == 5610:
-                return 122
-            elif self.frequency == 5690:
-                return 138
-            elif self.frequency == 5775:
-                return 155
-            elif self.frequency == 5855:
-                return 171
-        elif self.channel_width == 160:
-            if self.frequency == 5530:
-                return 106
-            elif self.frequency == 5610:
-                return 122
-            elif self.frequency == 5690:
-                return 138
-            elif self.frequency == 5775:
-                return 155
-            elif self.frequency == 5855:
-                return 171    
-        
- 
-        return None   
+        return _CHAN5.get((self.channel_width, self.frequency))
 
     @property
     def beamwidth_horizontal(self) -> float:
         """Return horizontal beamwidth with fallback to model defaults"""
-        return self.beamwidth_h or self._model_beamwidth()[0]
+        return self.beamwidth_h or self.model_beamwidth[0]
     
     @property
     def beamwidth_vertical(self) -> float:
         """Return vertical beamwidth with fallback to model defaults"""
-        return self.beamwidth_v or self._model_beamwidth()[1]
+        return self.beamwidth_v or self.model_beamwidth[1]
     
-    def _model_beamwidth(self) -> Tuple[float, float]:
+    @cached_property
+    def model_beamwidth(self) -> Tuple[float, float]:
         """Return default beamwidths (H, V) for common Ubiquiti models"""
         model_lower = self.model.lower()
         antenna_lower = self.antenna.lower()
@@ -263,7 +165,8 @@ class Antenna:
 
         return (60.0, 15.0)         # Default fallback
     
-    def _model_range_m(self) -> float:
+    @cached_property
+    def model_range_m(self) -> float:
         """Return effective range for common Ubiquiti models"""
         model_lower = self.model.lower()
         antenna_lower = self.antenna.lower()